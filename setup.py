@@ -16,4 +16,9 @@ setup(
         "redis",
         "retrying==1.3.3"
     ],
+    extras_require={
+        "async": ["aio-pika"],
+        "cache": ["pyarrow"],
+        "payloads": ["orjson"],
+    },
 )
@@ -0,0 +1,99 @@
+import asyncio
+
+import fakeredis.aioredis
+import pytest
+import redis
+
+from titanpublic import async_queuer
+
+
+ROUTING_KEY = "jobs-ncaam-dev"
+
+
+def build_channel(**kwargs):
+    channel = async_queuer.AsyncRedisChannel(block_timeout_sec=1, **kwargs)
+    channel.r = fakeredis.aioredis.FakeRedis()
+    return channel
+
+
+def test_failing_callback_stops_intake_and_reraises():
+    async def main():
+        channel = build_channel(max_concurrency=1, pop_batch=1)
+        await channel.r.rpush(ROUTING_KEY, *[str(i) for i in range(5)])
+        seen = list()
+
+        async def callback(_, __, ___, body):
+            seen.append(body)
+            raise ValueError(body)
+
+        with pytest.raises(ValueError):
+            await channel._consume_while_condition(
+                ROUTING_KEY, callback, lambda: True
+            )
+        return seen, await channel.r.lrange(ROUTING_KEY, 0, -1)
+
+    seen, left = asyncio.run(main())
+    assert seen == [b"0"]
+    assert left == [b"1", b"2", b"3", b"4"]
+
+
+def test_unyielded_messages_are_pushed_back():
+    async def main():
+        channel = build_channel(pop_batch=10)
+        await channel.r.rpush(ROUTING_KEY, *[str(i) for i in range(5)])
+        seen = list()
+
+        async def callback(_, __, ___, body):
+            seen.append(body)
+
+        await channel._consume_while_condition(
+            ROUTING_KEY, callback, lambda: channel.stats.consumed < 2
+        )
+        return seen, await channel.r.lrange(ROUTING_KEY, 0, -1)
+
+    seen, left = asyncio.run(main())
+    assert seen == [b"0", b"1"]
+    assert left == [b"2", b"3", b"4"]
+
+
+def test_concurrency_never_exceeds_max():
+    async def main():
+        channel = build_channel(max_concurrency=3, pop_batch=4)
+        await channel.r.rpush(ROUTING_KEY, *[str(i) for i in range(20)])
+        seen = list()
+        running = 0
+        most_running = 0
+
+        async def callback(_, __, ___, body):
+            nonlocal running, most_running
+            running += 1
+            most_running = max(most_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            seen.append(body)
+
+        await channel._consume_while_condition(
+            ROUTING_KEY, callback, lambda: len(seen) < 20
+        )
+        return seen, most_running
+
+    seen, most_running = asyncio.run(main())
+    assert len(seen) == 20
+    assert most_running == 3
+
+
+def test_pop_more_without_lpop_count():
+    async def main():
+        channel = build_channel()
+        await channel.r.rpush(ROUTING_KEY, "a", "b", "c")
+        lpop = channel.r.lpop
+
+        async def old_lpop(name, count=None):
+            if count is not None:
+                raise redis.exceptions.ResponseError("wrong number of arguments")
+            return await lpop(name)
+
+        channel.r.lpop = old_lpop
+        return await channel._pop_more(ROUTING_KEY, 5)
+
+    assert asyncio.run(main()) == [b"a", b"b", b"c"]
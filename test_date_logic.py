@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from titanpublic import date_logic
+
+
+# Around the season cutoff, month and year ends, and a leap day.
+DATES = [
+    20200101,
+    20200229,
+    20200301,
+    20200629,
+    20200630,
+    20200701,
+    20201231,
+    20210101,
+    20211106,
+    20220315,
+    20230630,
+    20240229,
+]
+SPORTS = ["ncaam", "ncaaw", "ncaaf"]
+
+
+@pytest.mark.parametrize("sport", SPORTS)
+@pytest.mark.parametrize(
+    "name",
+    [
+        "previous_year",
+        "current_year",
+        "current_year_through_week",
+        "current_year_through_yesterday",
+    ],
+)
+def test_window_arrays_match_scalars(name, sport):
+    scalar = getattr(date_logic, name)
+    st, en = getattr(date_logic, f"{name}_array")(DATES, sport=sport)
+    assert list(zip(st.tolist(), en.tolist())) == [
+        scalar(date, sport=sport) for date in DATES
+    ]
+
+
+@pytest.mark.parametrize("sport", SPORTS)
+def test_previous_years_array_matches_scalar(sport):
+    st, en = date_logic.previous_years_array(DATES, 3, sport=sport)
+    assert list(zip(st.tolist(), en.tolist())) == [
+        date_logic.previous_years(date, 3, sport=sport) for date in DATES
+    ]
+
+
+@pytest.mark.parametrize("sport", SPORTS)
+def test_labels_match_scalars(sport):
+    assert date_logic.season_year_label_array(DATES, sport=sport).tolist() == [
+        date_logic.season_year_label(date, sport=sport) for date in DATES
+    ]
+    assert date_logic.approx_season_start_array(DATES, sport).tolist() == [
+        date_logic.approx_season_start(date, sport) for date in DATES
+    ]
+
+
+def test_arrays_reject_unknown_sports():
+    with pytest.raises(NotImplementedError):
+        date_logic.current_year_array(np.array(DATES), sport="nba")
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from titanpublic import hash
+
+
+def test_game_hashes_matches_game_hash():
+    away = ["a", "b", "a", "Saint Mary's", "a"]
+    home = ["b", "a", "c", "Gonzaga", "b"]
+    date = [20220101, 20220101, 20220102, 20230315, 20220101]
+
+    expected = [hash.game_hash(*game) for game in zip(away, home, date)]
+    assert hash.game_hashes(away, home, date).tolist() == expected
+
+
+def test_game_hashes_takes_series_and_arrays():
+    df = pd.DataFrame(
+        {"away": ["x", "y"], "home": ["y", "x"], "date": [20211201, 20211202]}
+    )
+    result = hash.game_hashes(df["away"], df["home"], df["date"].to_numpy())
+    assert result.dtype == np.int64
+    assert result.tolist() == [
+        hash.game_hash("x", "y", 20211201),
+        hash.game_hash("y", "x", 20211202),
+    ]
+
+
+def test_game_hashes_empty():
+    assert len(hash.game_hashes([], [], [])) == 0
+
+
+def test_game_hashes_with_missing_values():
+    away = ["a", None, "b", np.nan]
+    home = ["b", "c", None, "d"]
+    date = [1, 2, 3, 4]
+
+    expected = [hash.game_hash(*game) for game in zip(away, home, date)]
+    assert hash.game_hashes(away, home, date).tolist() == expected
+
+
+def test_game_hashes_with_mixed_date_types():
+    away = ["a", "b", "c"]
+    home = ["b", "c", "a"]
+    date = [20220101, 20220102.0, 20220103]
+
+    expected = [hash.game_hash(*game) for game in zip(away, home, date)]
+    assert hash.game_hashes(away, home, date).tolist() == expected
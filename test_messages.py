@@ -0,0 +1,72 @@
+import pytest
+
+from titanpublic import messages
+
+
+BODIES = [
+    "ncaam elo 1650000000 Duke UNC 20220305 0",
+    "ncaam elo 1650000000,1650000100 Saint_Mary's Gonzaga 20220306 1",
+    "ncaaf spread 1 a b 20211106 0",
+]
+
+
+def test_job_text_round_trip():
+    for body in BODIES:
+        assert messages.Job.from_text(body).to_text() == body
+
+
+def test_jobs_round_trip():
+    jobs = [messages.Job.from_text(body) for body in BODIES]
+    encoded = messages.encode_jobs(jobs)
+    assert messages.is_binary(encoded)
+    assert messages.decode_jobs(encoded) == jobs
+    assert messages.decode_bodies(encoded) == BODIES
+
+
+def test_text_bodies_pass_through():
+    for body in BODIES:
+        assert not messages.is_binary(body)
+        assert messages.decode_bodies(body) == [body]
+        assert messages.decode_bodies(body.encode()) == [body]
+        assert messages.decode_jobs(body) == [messages.Job.from_text(body)]
+
+
+def test_empty_envelope():
+    assert messages.decode_bodies(messages.encode_jobs([])) == []
+
+
+def test_notifications_round_trip():
+    notifications = [
+        (BODIES[0], 1650000500, "success"),
+        (BODIES[1], 0, "failure"),
+        (BODIES[2], 0, "critical"),
+    ]
+    decoded = messages.decode_notifications(
+        messages.encode_notifications(notifications)
+    )
+    assert [
+        (job.to_text(), output_timestamp, status)
+        for job, output_timestamp, status in decoded
+    ] == notifications
+
+
+def test_text_notification():
+    ((job, output_timestamp, status),) = messages.decode_notifications(
+        f"{BODIES[1]} 1650000500 success"
+    )
+    assert (job.to_text(), output_timestamp, status) == (
+        BODIES[1],
+        1650000500,
+        "success",
+    )
+
+
+def test_decode_rejects_other_kinds_and_versions():
+    notifications = messages.encode_notifications([(BODIES[0], 1, "success")])
+    with pytest.raises(ValueError):
+        messages.decode_jobs(notifications)
+
+    jobs = messages.encode_jobs([messages.Job.from_text(BODIES[0])])
+    future_version = jobs[:1] + bytes([messages.VERSION + 1]) + jobs[2:]
+    with pytest.raises(ValueError):
+        messages.decode_jobs(future_version)
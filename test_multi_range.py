@@ -0,0 +1,60 @@
+import pickle
+import random
+
+import numpy as np
+
+from titanpublic.shared_types import MultiRange
+
+
+def as_set(multi_range):
+    return {d for st, en in multi_range.ranges for d in range(st, en)}
+
+
+def random_multi_range(rng):
+    ranges = list()
+    for _ in range(rng.randint(0, 4)):
+        st = rng.randint(0, 30)
+        ranges.append((st, st + rng.randint(0, 8)))
+    return MultiRange(ranges)
+
+
+def test_normalizes_ranges():
+    assert MultiRange([(5, 8), (1, 3), (3, 4), (7, 10), (12, 12)]).ranges == (
+        (1, 4),
+        (5, 10),
+    )
+    assert MultiRange([(1, 3)]) == MultiRange([(1, 2), (2, 3)])
+    assert hash(MultiRange([(1, 3)])) == hash(MultiRange([(1, 2), (2, 3)]))
+    assert not MultiRange([(4, 4)])
+
+
+def test_set_algebra_matches_sets():
+    rng = random.Random(0)
+    for _ in range(500):
+        a, b = random_multi_range(rng), random_multi_range(rng)
+        assert as_set(a | b) == as_set(a) | as_set(b)
+        assert as_set(a & b) == as_set(a) & as_set(b)
+        assert as_set(a - b) == as_set(a) - as_set(b)
+        assert a.covers(a & b)
+        assert (a | b).covers(b)
+        # Results are normalized, so equal sets are equal MultiRanges.
+        assert (a - b) | (a & b) == a
+
+
+def test_contains_and_mask_match_sets():
+    rng = random.Random(1)
+    dates = np.arange(-2, 42)
+    for _ in range(200):
+        multi_range = random_multi_range(rng)
+        expected = [d in as_set(multi_range) for d in dates.tolist()]
+        assert multi_range.mask(dates).tolist() == expected
+        assert [multi_range.contains(d) for d in dates.tolist()] == expected
+
+
+def test_mask_of_empty():
+    assert MultiRange([]).mask([20220101, 20220102]).tolist() == [False, False]
+
+
+def test_pickles():
+    multi_range = MultiRange([(20200101, 20200301), (20210101, 20210301)])
+    assert pickle.loads(pickle.dumps(multi_range)) == multi_range
@@ -0,0 +1,44 @@
+import time
+from unittest import mock
+
+import fakeredis
+
+from titanpublic import queuer
+
+
+def build_channel(r):
+    channel = queuer.RedisChannel(block_timeout_sec=1)
+    channel.r = r
+    channel.sport = "ncaam"
+    channel.env = "dev"
+    return channel
+
+
+def test_worker_stays_live_during_slow_callbacks():
+    r = fakeredis.FakeRedis()
+    channel = build_channel(r)
+    channel.queue_declare_partitioned("jobs", num_shards=1)
+    channel.basic_publish_partitioned("job", "jobs", game_hash=1, num_shards=1)
+    workers_key = "jobs-ncaam-dev:workers"
+
+    live_during_callback = list()
+
+    def slow_callback(*args):
+        # Longer than a worker's TTL.
+        time.sleep(0.5)
+        live_during_callback.append(channel.partition_workers_impl("jobs-ncaam-dev"))
+
+    with mock.patch.object(queuer, "HEARTBEAT_SEC", 0.05), mock.patch.object(
+        queuer, "WORKER_TTL_SEC", 0.2
+    ):
+        channel.consume_partitioned_while_condition(
+            "jobs",
+            slow_callback,
+            lambda: not live_during_callback,
+            num_shards=1,
+            worker_id="w",
+        )
+
+    assert live_during_callback == [["w"]]
+    # Left the group when it stopped.
+    assert r.zcard(workers_key) == 0
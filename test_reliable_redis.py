@@ -0,0 +1,91 @@
+import time
+
+import fakeredis
+
+from titanpublic import queuer
+
+
+ROUTING_KEY = "ncaam-dev-jobs"
+
+
+def build_channel(r, consumer_id, **kwargs):
+    channel = queuer.ReliableRedisChannel(
+        consumer_id=consumer_id, block_timeout_sec=1, **kwargs
+    )
+    channel.r = r
+    return channel
+
+
+def consume_one(channel):
+    return next(iter(channel.consumption_impl(ROUTING_KEY)))
+
+
+def test_identical_messages_are_tracked_separately():
+    r = fakeredis.FakeRedis()
+    channel = build_channel(r, "a")
+    channel.basic_publish_many_impl(ROUTING_KEY, ["same", "same"])
+
+    first = consume_one(channel)
+    second = consume_one(channel)
+    assert first[3] == second[3] == b"same"
+    assert first[1].delivery_id != second[1].delivery_id
+
+    channel.nack_impl(ROUTING_KEY, first)
+    channel.ack_impl(ROUTING_KEY, second)
+    assert r.lrange(ROUTING_KEY, 0, -1) == [first[1].element]
+    assert r.hgetall(channel._attempts_key(ROUTING_KEY)) == {
+        first[1].delivery_id: b"1"
+    }
+
+
+def test_reap_requeues_messages_of_expired_consumers():
+    r = fakeredis.FakeRedis()
+    dead = build_channel(r, "dead", visibility_timeout_sec=0)
+    dead.basic_publish_impl(ROUTING_KEY, "job")
+    consume_one(dead)
+
+    # Took a message, then died before its lease was renewed.
+    r.zadd(dead._leases_key(ROUTING_KEY), {"dead": time.time() - 1})
+    alive = build_channel(r, "alive")
+    alive.reap(ROUTING_KEY)
+
+    assert r.llen(alive.processing_key(ROUTING_KEY, "dead")) == 0
+    assert r.zscore(alive._leases_key(ROUTING_KEY), "dead") is None
+    assert consume_one(alive)[3] == b"job"
+
+
+def test_message_is_never_in_processing_without_a_lease():
+    r = fakeredis.FakeRedis()
+    channel = build_channel(r, "a")
+    channel.basic_publish_impl(ROUTING_KEY, "job")
+
+    # The lease is taken before the move, so it's there however the pop ends.
+    consumption = channel.consumption_impl(ROUTING_KEY)
+    next(consumption)
+    assert r.zscore(channel._leases_key(ROUTING_KEY), "a") > time.time()
+
+
+def test_dead_letter_after_max_attempts():
+    r = fakeredis.FakeRedis()
+    channel = build_channel(r, "a", max_attempts=2)
+    channel.basic_publish_impl(ROUTING_KEY, "job")
+
+    for _ in range(2):
+        channel.nack_impl(ROUTING_KEY, consume_one(channel))
+
+    assert r.llen(ROUTING_KEY) == 0
+    (element,) = r.lrange(channel.dead_letter_key(ROUTING_KEY), 0, -1)
+    assert channel.split_delivery_id(element)[1] == b"job"
+    assert not r.hgetall(channel._attempts_key(ROUTING_KEY))
+
+
+def test_messages_without_delivery_ids():
+    r = fakeredis.FakeRedis()
+    channel = build_channel(r, "a")
+    r.rpush(ROUTING_KEY, "plain job")
+
+    callback_args = consume_one(channel)
+    assert callback_args[3] == b"plain job"
+    channel.ack_impl(ROUTING_KEY, callback_args)
+    assert r.llen(channel.processing_key(ROUTING_KEY, "a")) == 0
+
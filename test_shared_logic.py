@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from titanpublic import cache_backends, shared_logic
+
+
+def counted(**cache_kwargs):
+    """Returns a cached identity function, and the list of args it actually ran on."""
+    calls = list()
+
+    @shared_logic.cache(**cache_kwargs)
+    def func(x):
+        calls.append(x)
+        return x
+
+    return func, calls
+
+
+def test_concurrent_misses_run_once():
+    calls = list()
+    barrier = threading.Barrier(8)
+
+    @shared_logic.cache()
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return x * 2
+
+    results = list()
+
+    def worker():
+        barrier.wait()
+        results.append(slow(3))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [3]
+    assert results == [6] * 8
+    assert slow.cache_info().misses == 1
+    assert slow.cache_info().hits == 7
+
+
+def test_evicts_least_recently_used():
+    func, calls = counted(maxsize=2)
+    func(1)
+    func(2)
+    func(1)  # Now 2 is the least recently used
+    func(3)
+    assert func.cache_info().currsize == 2
+
+    func(1)
+    assert calls == [1, 2, 3]
+    func(2)
+    assert calls == [1, 2, 3, 2]
+
+
+def test_success_ttl_expires():
+    func, calls = counted(ttl=0.2)
+    func(1)
+    func(1)
+    assert calls == [1]
+
+    time.sleep(0.3)
+    func(1)
+    assert calls == [1, 1]
+
+
+@pytest.mark.parametrize("use_sqlite", [False, True])
+def test_ttl_cache_exception_reruns_after_expiry(tmp_path, use_sqlite):
+    backend = None
+    if use_sqlite:
+        backend = cache_backends.SqliteBackend(str(tmp_path / "cache.db"))
+    calls = list()
+
+    @shared_logic.cache(ttl_cache_exception={ValueError: 0.2}, backend=backend)
+    def bad_func(x):
+        calls.append(x)
+        raise ValueError(str(x))
+
+    for _ in range(2):
+        with pytest.raises(ValueError, match="1"):
+            bad_func(1)
+    assert calls == [1]
+
+    time.sleep(0.3)
+    with pytest.raises(ValueError, match="1"):
+        bad_func(1)
+    assert calls == [1, 1]
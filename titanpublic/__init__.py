@@ -1,7 +1,29 @@
+from . import as_of
+from . import async_queuer
+from . import cache_backends
+from . import concurrency
+from . import connection_pool
 from . import date_logic
+from . import flow_control
 from . import hash
+from . import local_cache
+from . import messages
+from . import partitioning
+from . import payloads
 from . import pod_helpers
 from . import queuer
 from . import shared_logic
 from . import shared_types
-from .pull_data import update_feature, pull_data, pull_data_multi_range, pull_single_game
+from .pull_data import (
+    update_feature,
+    update_feature_many,
+    pull_data,
+    pull_data_iter,
+    pull_data_since,
+    merge_delta,
+    pull_data_multi_range,
+    pull_data_multi_range_iter,
+    pull_games,
+    pull_single_game,
+)
+from .local_cache import pull_data_cached
@@ -0,0 +1,188 @@
+"""Answer many point-in-time window queries from a single pull.
+
+Models usually pull a window like date_logic.current_year_through_yesterday(date) for
+each game they run on, so a season of games re-pulls nearly the same rows over and
+over.  An AsOfIndex pulls the covering dates once, sorts the rows by date, and then
+finds each window with a binary search, returning a slice of the sorted rows.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from . import pull_data, shared_types
+
+
+class AsOfIndex(object):
+    """Rows sorted by date, for slicing out [st, en) windows.
+
+    Windows are half-open, like pull_data's min_date and max_date.  A window must lie
+    within the covered dates, or it could silently miss rows.
+
+    For sum_columns, prefix sums are precomputed, so window sums, counts, and means
+    are O(log n) per window, and vectorized over many windows at once.  Nulls are
+    skipped, as in pandas.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        max_timestamp: int,
+        covered: shared_types.MultiRange,
+        sum_columns: Iterable[str] = (),
+    ):
+        self.sum_columns = tuple(sum_columns)
+        # Set by pull, so that extend knows how to pull more.
+        self._pull_args: Optional[Tuple[str, Tuple[str, ...], Dict[str, Any], bool]] = (
+            None
+        )
+        self._build(df, max_timestamp, covered)
+
+    def _build(
+        self, df: pd.DataFrame, max_timestamp: int, covered: shared_types.MultiRange
+    ) -> None:
+        self.df = df.sort_values("date", kind="stable").reset_index(drop=True)
+        # The max over everything pulled, so it bounds the max of any window.
+        self.max_timestamp = max_timestamp
+        self.covered = covered
+        self._dates = self.df["date"].to_numpy()
+
+        self._sums: Dict[str, np.ndarray] = dict()
+        self._counts: Dict[str, np.ndarray] = dict()
+        for col in self.sum_columns:
+            values = self.df[col].to_numpy(dtype=float, na_value=np.nan)
+            present = ~np.isnan(values)
+            self._sums[col] = np.concatenate(
+                [[0.0], np.cumsum(np.where(present, values, 0.0))]
+            )
+            self._counts[col] = np.concatenate([[0], np.cumsum(present)])
+
+    @classmethod
+    def pull(
+        cls,
+        db_name: str,
+        features: Tuple[str, ...],
+        multi_range: shared_types.MultiRange,
+        secrets: Dict[str, Any],
+        pull_payload: bool = False,
+        sum_columns: Optional[Iterable[str]] = None,
+    ) -> "AsOfIndex":
+        """Pull every range in multi_range once, and index it.
+
+        Args:
+            (Same as pull_data.pull_data_multi_range.)
+            sum_columns: Columns to precompute window aggregates for.  Defaults to
+                the features with numeric values.
+        """
+        df, max_timestamp = pull_data.pull_data_multi_range(
+            db_name, features, multi_range, secrets, pull_payload=pull_payload
+        )
+        if sum_columns is None:
+            sum_columns = [
+                f for f in features if pd.api.types.is_numeric_dtype(df[f].dtype)
+            ]
+        index = cls(df, max_timestamp, multi_range, sum_columns=sum_columns)
+        index._pull_args = (db_name, features, secrets, pull_payload)
+        return index
+
+    def extend(self, multi_range: shared_types.MultiRange) -> None:
+        """Make sure multi_range is covered, pulling only the dates that aren't yet.
+
+        Only for indices made with pull.
+        """
+        missing = multi_range - self.covered
+        if not missing:
+            return
+        if self._pull_args is None:
+            raise ValueError("Can only extend an AsOfIndex made with pull")
+        db_name, features, secrets, pull_payload = self._pull_args
+        df, max_timestamp = pull_data.pull_data_multi_range(
+            db_name, features, missing, secrets, pull_payload=pull_payload
+        )
+        self._build(
+            pd.concat([self.df, df], ignore_index=True),
+            max(self.max_timestamp, max_timestamp),
+            self.covered | missing,
+        )
+
+    def _check_covered(self, st: np.ndarray, en: np.ndarray) -> None:
+        # Covered ranges are sorted and disjoint, so a window is covered if it fits in
+        #  the range with the last start <= st.  Empty windows are always fine.
+        starts = np.array([r[0] for r in self.covered.ranges] or [0], dtype=np.int64)
+        ends = np.array([r[1] for r in self.covered.ranges] or [0], dtype=np.int64)
+        k = np.searchsorted(starts, st, side="right") - 1
+        covered = (k >= 0) & (en <= ends[np.maximum(k, 0)]) & bool(self.covered.ranges)
+        bad = np.flatnonzero(np.ravel((st < en) & ~covered))
+        if len(bad):
+            raise ValueError(
+                f"Window [{np.ravel(st)[bad[0]]}, {np.ravel(en)[bad[0]]}) isn't covered "
+                "by this index"
+            )
+
+    def bounds(self, st, en) -> Tuple[np.ndarray, np.ndarray]:
+        """Row positions [i, j) for each window [st, en).  Takes scalars or arrays.
+
+        Pairs well with the date_logic *_array functions, to find the window for
+        every game at once.
+        """
+        st = np.asarray(st)
+        en = np.asarray(en)
+        self._check_covered(st, en)
+        i = np.searchsorted(self._dates, st, side="left")
+        j = np.searchsorted(self._dates, en, side="left")
+        return i, np.maximum(i, j)
+
+    def window(self, st: int, en: int) -> pd.DataFrame:
+        """The rows with st <= date < en, as a slice of the sorted rows."""
+        i, j = self.bounds(st, en)
+        return self.df.iloc[int(i) : int(j)]
+
+    def as_of(
+        self,
+        date: shared_types.Date,
+        window_func: Callable[
+            ...,
+            Union[Tuple[shared_types.Date, shared_types.Date], shared_types.MultiRange],
+        ],
+        **kwargs,
+    ) -> pd.DataFrame:
+        """The rows in window_func(date, **kwargs), for a date_logic window function.
+
+        For example, as_of(date, date_logic.current_year_through_yesterday,
+        sport="ncaam").  Window functions that return a MultiRange, like
+        previous_years_with_gaps, go through window_multi.
+        """
+        window = window_func(date, **kwargs)
+        if isinstance(window, shared_types.MultiRange):
+            return self.window_multi(window)
+        st, en = window
+        return self.window(st, en)
+
+    def window_multi(self, multi_range: shared_types.MultiRange) -> pd.DataFrame:
+        """The rows in every range of multi_range, ordered by range.
+
+        Unlike window, this copies, since the ranges needn't be adjacent.
+        """
+        slices = [self.window(st, en) for st, en in multi_range.ranges]
+        if not slices:
+            return self.df.iloc[0:0]
+        return pd.concat(slices, ignore_index=True)
+
+    def window_sum(self, col: str, st, en) -> np.ndarray:
+        """Sum of col over each window, skipping nulls."""
+        i, j = self.bounds(st, en)
+        return self._sums[col][j] - self._sums[col][i]
+
+    def window_count(self, col: str, st, en) -> np.ndarray:
+        """Non-null values of col in each window."""
+        i, j = self.bounds(st, en)
+        return self._counts[col][j] - self._counts[col][i]
+
+    def window_mean(self, col: str, st, en) -> np.ndarray:
+        """Mean of col over each window, skipping nulls.  NaN for empty windows."""
+        i, j = self.bounds(st, en)
+        sums = self._sums[col][j] - self._sums[col][i]
+        counts = self._counts[col][j] - self._counts[col][i]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
@@ -0,0 +1,401 @@
+"""Asyncio versions of the queuer channels.
+
+These have the same declare / publish / clear / consume API as queuer.QueueChannel,
+but every method is a coroutine and callbacks are async.  Up to max_concurrency
+callbacks run at once, so one process can keep many I/O-bound model calls in flight.
+
+AsyncRabbitChannel needs aio-pika (`pip install titanpublic[async]`).
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import ssl
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Set
+
+import redis
+import redis.asyncio
+import titanpublic
+
+from .queuer import (
+    BIGGER_WAIT_SEC,
+    PREFETCH_COUNT,
+    PUBLISH_CHUNK_SIZE,
+    RABBIT_INACTIVITY_SEC,
+    REDIS_BLOCK_TIMEOUT_SEC,
+    REDIS_POP_BATCH,
+    RETRIES,
+    ROLLOVER_WAIT_SEC,
+    CallbackArgument,
+    ConditionSignature,
+    ConsumerStats,
+    msg_pad,
+)
+
+try:
+    import aio_pika
+except ImportError:
+    aio_pika = None
+
+
+ASYNC_MAX_CONCURRENCY = 200  # Callbacks in flight at once per channel
+
+AsyncCallbackSignature = Callable[
+    [Optional[str], Optional[str], Optional[str], Optional[str]], Awaitable[None]
+]
+
+
+class AsyncQueueChannel(object):
+    def __init__(self, max_concurrency: int = ASYNC_MAX_CONCURRENCY):
+        self.sport = os.environ.get("SPORT", "ncaam")
+        self.env = os.environ.get("TITAN_ENV", "dev")
+        self.built = False
+        self.max_concurrency = max_concurrency
+
+        self.retry_exceptions = ()
+
+        self.all_queues: Set[str] = set()
+        self.built_queues: Set[str] = set()
+
+    async def build_channel(self) -> None:
+        """Must be awaited before using the channel."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                logging.error("Establishing queue channnel")
+                self._channel = await self.build_channel_impl()
+                break
+            except Exception:
+                if RETRIES is not None and attempt >= RETRIES:
+                    raise
+                await asyncio.sleep(BIGGER_WAIT_SEC)
+        self.built = True
+
+        # Rebuild the queues
+        self.built_queues = set()
+        for queue_routing_id in self.all_queues:
+            await self.queue_declare(queue_routing_id)
+
+    async def build_channel_impl(self) -> Any:
+        raise NotImplementedError
+
+    def _routing_key(self, queue_id: str, suffix: str = "") -> str:
+        return titanpublic.pod_helpers.routing_key_resolver(
+            queue_id,
+            self.sport,
+            self.env,
+            suffix=suffix,
+        )
+
+    def _check_queue(self, queue_id: str) -> None:
+        if not self.built:
+            raise AttributeError("Pls build channel first.")
+        if queue_id not in self.all_queues:
+            raise Exception(f"Please first build queue {queue_id}")
+
+    async def queue_declare(self, queue_id: str, suffix: str = "") -> None:
+        if not self.built:
+            raise AttributeError("Pls build channel first.")
+        if not queue_id:
+            # Handle a special edge case, so that we don't have to handle outside of
+            #  class.
+            return
+        if queue_id in self.built_queues:
+            # This has already been built.
+            return
+
+        routing_key = self._routing_key(queue_id, suffix=suffix)
+        try:
+            await self.queue_declare_impl(routing_key)
+        except self.retry_exceptions:
+            # Try rebuilding
+            await self.build_channel()
+            await self.queue_declare_impl(routing_key)
+
+        self.all_queues.add(queue_id)
+        self.built_queues.add(queue_id)
+
+    async def queue_declare_impl(self, routing_key: str) -> None:
+        raise NotImplementedError
+
+    async def queue_clear(self, queue_id: str, suffix: Optional[str] = None) -> None:
+        if suffix:
+            raise Exception("suffix isn't supported for this operation")
+        self._check_queue(queue_id)
+
+        routing_key = self._routing_key(queue_id)
+        try:
+            await self.queue_clear_impl(routing_key)
+        except self.retry_exceptions:
+            await self.build_channel()
+            await self.queue_clear(queue_id)
+
+    async def queue_clear_impl(self, routing_key: str) -> None:
+        raise NotImplementedError
+
+    async def basic_publish(self, msg: str, queue_id: str, suffix: str = "") -> None:
+        self._check_queue(queue_id)
+
+        routing_key = self._routing_key(queue_id, suffix=suffix)
+        try:
+            await self.basic_publish_impl(routing_key, msg)
+        except self.retry_exceptions:
+            await self.build_channel()
+            await self.basic_publish(msg, queue_id, suffix)
+
+    async def basic_publish_impl(self, routing_key: str, msg: str) -> None:
+        raise NotImplementedError
+
+    async def basic_publish_many(
+        self, msgs: List[str], queue_id: str, suffix: str = ""
+    ) -> None:
+        """See queuer.QueueChannel.basic_publish_many"""
+        self._check_queue(queue_id)
+        if not msgs:
+            return
+
+        routing_key = self._routing_key(queue_id, suffix=suffix)
+        try:
+            await self.basic_publish_many_impl(routing_key, msgs)
+        except self.retry_exceptions:
+            await self.build_channel()
+            await self.basic_publish_many(msgs, queue_id, suffix)
+
+    async def basic_publish_many_impl(self, routing_key: str, msgs: List[str]) -> None:
+        for msg in msgs:
+            await self.basic_publish_impl(routing_key, msg)
+
+    async def _consume_while_condition(
+        self,
+        routing_key: str,
+        callback: AsyncCallbackSignature,
+        condition: ConditionSignature,
+    ) -> None:
+        """Start a task per message, with at most max_concurrency running.
+
+        Stops taking messages when condition fails or a callback raises, then waits
+        for the running callbacks.  The first callback exception is re-raised.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks: Set[asyncio.Task] = set()
+        failures: List[BaseException] = list()
+
+        async def run(callback_args: CallbackArgument) -> None:
+            try:
+                await callback(*callback_args)
+            except Exception as err:
+                failures.append(err)
+            finally:
+                semaphore.release()
+
+        try:
+            while condition() and not failures:
+                async with contextlib.aclosing(
+                    self.consumption_impl(routing_key)
+                ) as messages:
+                    while True:
+                        # Take a slot before pulling a message, so that messages we
+                        #  stop short of stay unyielded and go back on the queue.
+                        await semaphore.acquire()
+                        if failures or not condition():
+                            semaphore.release()
+                            break
+                        try:
+                            callback_args = await messages.__anext__()
+                        except StopAsyncIteration:
+                            semaphore.release()
+                            break
+                        task = asyncio.create_task(run(callback_args))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks)
+
+        if failures:
+            raise failures[0]
+
+    async def consume_while_condition(
+        self,
+        queue_id: str,
+        callback: AsyncCallbackSignature,
+        condition: ConditionSignature,
+        suffix="",
+    ) -> None:
+        self._check_queue(queue_id)
+
+        routing_key = self._routing_key(queue_id, suffix=suffix)
+        try:
+            await self._consume_while_condition(routing_key, callback, condition)
+        except self.retry_exceptions:
+            logging.error("Async queue exception")
+            await asyncio.sleep(ROLLOVER_WAIT_SEC)
+            await self.build_channel()
+            await self.consume_while_condition(
+                queue_id, callback, condition, suffix=suffix
+            )
+
+    async def consume_to_death(
+        self, queue_id: str, callback: AsyncCallbackSignature, suffix: str = ""
+    ) -> None:
+        await self.consume_while_condition(
+            queue_id, callback, lambda: True, suffix=suffix
+        )
+
+    def consumption_impl(self, routing_key: str) -> AsyncIterator[CallbackArgument]:
+        raise NotImplementedError
+
+
+class AsyncRedisChannel(AsyncQueueChannel):
+    """Async version of queuer.RedisChannel, with the same blocking batch pops."""
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        max_concurrency: int = ASYNC_MAX_CONCURRENCY,
+        pop_batch: int = REDIS_POP_BATCH,
+        block_timeout_sec: int = REDIS_BLOCK_TIMEOUT_SEC,
+    ):
+        super().__init__(max_concurrency=max_concurrency)
+        self.r = redis.asyncio.Redis(host=host, port=port, db=0)
+        self.pop_batch = pop_batch
+        self.block_timeout_sec = block_timeout_sec
+        self.stats = ConsumerStats()
+
+    async def build_channel_impl(self) -> None:
+        pass  # Nothing to do for redis
+
+    async def queue_declare_impl(self, routing_key: str) -> None:
+        pass  # Nothing to do for redis
+
+    async def queue_clear_impl(self, routing_key: str) -> None:
+        await self.r.delete(routing_key)
+
+    async def basic_publish_impl(self, routing_key: str, msg: str) -> None:
+        await self.r.rpush(routing_key, msg)
+
+    async def basic_publish_many_impl(self, routing_key: str, msgs: List[str]) -> None:
+        pipe = self.r.pipeline(transaction=False)
+        for i in range(0, len(msgs), PUBLISH_CHUNK_SIZE):
+            pipe.rpush(routing_key, *msgs[i : i + PUBLISH_CHUNK_SIZE])
+        await pipe.execute()
+
+    async def _pop_more(self, routing_key: str, count: int) -> List[bytes]:
+        try:
+            return await self.r.lpop(routing_key, count) or list()
+        except redis.exceptions.ResponseError:
+            # LPOP with a count needs Redis 6.2, so fall back to a pipeline.
+            pipe = self.r.pipeline(transaction=False)
+            for _ in range(count):
+                pipe.lpop(routing_key)
+            return [msg for msg in await pipe.execute() if msg is not None]
+
+    async def consumption_impl(
+        self, routing_key: str
+    ) -> AsyncIterator[CallbackArgument]:
+        """See queuer.RedisChannel.consumption_impl"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        self.stats.pops += 1
+        popped = await self.r.blpop([routing_key], timeout=self.block_timeout_sec)
+        self.stats.idle_sec += loop.time() - start
+        if popped is None:
+            self.stats.empty_pops += 1
+            return
+
+        busy_start = loop.time()
+        msgs = [popped[1]]
+        if self.pop_batch > 1:
+            msgs.extend(await self._pop_more(routing_key, self.pop_batch - 1))
+
+        next_i = 0
+        try:
+            for i, msg in enumerate(msgs):
+                next_i = i + 1
+                self.stats.consumed += 1
+                yield msg_pad(msg)
+        finally:
+            if next_i < len(msgs):
+                await self.r.lpush(routing_key, *reversed(msgs[next_i:]))
+            self.stats.busy_sec += loop.time() - busy_start
+
+
+class AsyncRabbitChannel(AsyncQueueChannel):
+    """Async version of queuer.RabbitChannel, on aio-pika."""
+
+    def __init__(
+        self,
+        rabbitmq_user: str,
+        rabbitmq_password: str,
+        rabbitmq_broker_id: str,
+        max_concurrency: int = ASYNC_MAX_CONCURRENCY,
+    ):
+        if aio_pika is None:
+            raise ImportError("AsyncRabbitChannel requires aio-pika")
+        super().__init__(max_concurrency=max_concurrency)
+        if "prod" == self.env:
+            self.retry_exceptions = (
+                *self.retry_exceptions,
+                aio_pika.exceptions.AMQPError,
+            )
+        self.rabbitmq_user = rabbitmq_user
+        self.rabbitmq_password = rabbitmq_password
+        self.rabbitmq_broker_id = rabbitmq_broker_id
+        self._queues = dict()
+
+    async def build_channel_impl(self) -> Any:
+        logging.error("Starting aio-pika connection")
+
+        # SSL Context for TLS configuration of Amazon MQ for RabbitMQ
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLSv1_2)
+        ssl_context.set_ciphers("ECDHE+AESGCM:!ECDSA")
+
+        url = (
+            f"amqps://{self.rabbitmq_user}:{self.rabbitmq_password}@"
+            f"{self.rabbitmq_broker_id}.mq.us-east-2.amazonaws.com:5671"
+            "?heartbeat=600"
+        )
+        connection = await aio_pika.connect_robust(url, ssl_context=ssl_context)
+        channel = await connection.channel()
+        await channel.set_qos(prefetch_count=PREFETCH_COUNT)
+        self._queues = dict()
+        return channel
+
+    async def queue_declare_impl(self, routing_key: str) -> None:
+        self._queues[routing_key] = await self._channel.declare_queue(routing_key)
+
+    async def _queue(self, routing_key: str) -> Any:
+        if routing_key not in self._queues:
+            await self.queue_declare_impl(routing_key)
+        return self._queues[routing_key]
+
+    async def queue_clear_impl(self, routing_key: str) -> None:
+        await (await self._queue(routing_key)).purge()
+
+    async def basic_publish_impl(self, routing_key: str, msg: str) -> None:
+        await self._channel.default_exchange.publish(
+            aio_pika.Message(
+                body=msg.encode(),
+                delivery_mode=aio_pika.DeliveryMode.NOT_PERSISTENT,
+            ),
+            routing_key=routing_key,
+        )
+
+    async def consumption_impl(
+        self, routing_key: str
+    ) -> AsyncIterator[CallbackArgument]:
+        """Yields messages until the queue has been empty for a while."""
+        queue = await self._queue(routing_key)
+        async with queue.iterator(no_ack=True) as messages:
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        messages.__anext__(), RABBIT_INACTIVITY_SEC
+                    )
+                except asyncio.TimeoutError:
+                    logging.debug("aio-pika timeout")
+                    return
+                yield (None, message, message.info(), message.body)
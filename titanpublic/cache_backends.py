@@ -0,0 +1,280 @@
+"""Storage for shared_logic.cache.
+
+A backend stores (result, expiry) by function name and key.  Expiries are wall-clock
+times from time.time(), so that they mean the same thing in every process.  The dict
+backend is per process; the SQLite and Redis backends are shared between processes
+on a node, or between nodes, and store pickled values.
+
+The shared backends store keys by canonical_key, which is the same for equal keys
+in every process, unlike pickle, whose bytes depend on things like dict order.
+"""
+
+import collections
+import hashlib
+import numbers
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import redis
+
+
+CacheEntry = Tuple[Any, Optional[float]]  # (result, expiry)
+
+SQLITE_TIMEOUT_SEC = 30  # How long to wait on another process's write lock
+REDIS_KEY_PREFIX = "titan-cache"
+
+
+def _dumps(entry: CacheEntry) -> bytes:
+    return pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _canonical_repr(value: Any) -> str:
+    # Equal keys must give equal strings, as they would hit the same dict entry.
+    #  So numbers that compare equal (True, 1, 1.0) share a repr, and unordered
+    #  containers are sorted.
+    if isinstance(value, numbers.Integral):
+        return repr(int(value))
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        return repr(int(value)) if value.is_integer() else repr(value)
+    if value is None or isinstance(value, (str, bytes)):
+        return repr(value)
+    if isinstance(value, tuple):
+        return "(" + ",".join(_canonical_repr(v) for v in value) + ")"
+    if isinstance(value, list):
+        return "[" + ",".join(_canonical_repr(v) for v in value) + "]"
+    if isinstance(value, (set, frozenset)):
+        return "{" + ",".join(sorted(_canonical_repr(v) for v in value)) + "}"
+    if isinstance(value, dict):
+        items = sorted(
+            _canonical_repr(k) + ":" + _canonical_repr(v) for k, v in value.items()
+        )
+        return "{" + ",".join(items) + "}"
+    type_name = f"{type(value).__module__}.{type(value).__qualname__}"
+    if type(value).__repr__ is object.__repr__:
+        # The default repr has the object's address, so pickle it instead.
+        return f"{type_name}:{pickle.dumps(value).hex()}"
+    return f"{type_name}:{value!r}"
+
+
+def canonical_key(key: Hashable) -> str:
+    """A digest of key, equal for equal keys in every process."""
+    return hashlib.sha256(_canonical_repr(key).encode()).hexdigest()
+
+
+class CacheBackend(object):
+    """Interface for cache storage.  Implementations must be thread-safe."""
+
+    def get(self, name: str, key: Hashable) -> Optional[CacheEntry]:
+        """The entry for key, or None.  Counts as a use, for LRU eviction."""
+        raise NotImplementedError
+
+    def set(self, name: str, key: Hashable, entry: CacheEntry) -> None:
+        raise NotImplementedError
+
+    def delete(self, name: str, key: Hashable) -> None:
+        raise NotImplementedError
+
+    def size(self, name: str) -> int:
+        raise NotImplementedError
+
+    def clear(self, name: str) -> None:
+        raise NotImplementedError
+
+
+class DictBackend(CacheBackend):
+    """In-process LRU dict.  Stores results as is, without pickling."""
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self.maxsize = maxsize
+        self._entries: Dict[str, "collections.OrderedDict[Hashable, CacheEntry]"] = (
+            collections.defaultdict(collections.OrderedDict)
+        )
+        self._lock = threading.Lock()
+
+    def get(self, name: str, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entries = self._entries[name]
+            if key not in entries:
+                return None
+            entries.move_to_end(key)
+            return entries[key]
+
+    def set(self, name: str, key: Hashable, entry: CacheEntry) -> None:
+        with self._lock:
+            entries = self._entries[name]
+            entries[key] = entry
+            entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(entries) > self.maxsize:
+                    entries.popitem(last=False)
+
+    def delete(self, name: str, key: Hashable) -> None:
+        with self._lock:
+            self._entries[name].pop(key, None)
+
+    def size(self, name: str) -> int:
+        with self._lock:
+            return len(self._entries[name])
+
+    def clear(self, name: str) -> None:
+        with self._lock:
+            self._entries[name].clear()
+
+
+class SqliteBackend(CacheBackend):
+    """On-disk cache, shared by all processes that use the same path.
+
+    Each thread (and each forked process) opens its own connection.  With maxsize,
+    keeps at most that many entries per function, evicting the least recently used.
+    """
+
+    def __init__(self, path: str, maxsize: Optional[int] = None):
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        con = self._connection()
+        with con:
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    name TEXT, key BLOB, entry BLOB, accessed REAL,
+                    PRIMARY KEY (name, key)
+                );
+            """
+            )
+            con.execute(
+                "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (name, accessed);"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.con = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT_SEC)
+            self._local.con.execute("PRAGMA journal_mode=WAL;")
+            self._local.pid = os.getpid()
+        return self._local.con
+
+    def get(self, name: str, key: Hashable) -> Optional[CacheEntry]:
+        con = self._connection()
+        key = canonical_key(key)
+        row = con.execute(
+            "SELECT entry FROM cache WHERE name = ? AND key = ?;", (name, key)
+        ).fetchone()
+        if row is None:
+            return None
+        if self.maxsize is not None:
+            with con:
+                con.execute(
+                    "UPDATE cache SET accessed = ? WHERE name = ? AND key = ?;",
+                    (time.time(), name, key),
+                )
+        return pickle.loads(row[0])
+
+    def set(self, name: str, key: Hashable, entry: CacheEntry) -> None:
+        con = self._connection()
+        with con:
+            con.execute(
+                "REPLACE INTO cache (name, key, entry, accessed) VALUES (?, ?, ?, ?);",
+                (name, canonical_key(key), _dumps(entry), time.time()),
+            )
+            if self.maxsize is not None:
+                con.execute(
+                    """
+                    DELETE FROM cache WHERE name = ? AND key NOT IN (
+                        SELECT key FROM cache WHERE name = ?
+                        ORDER BY accessed DESC LIMIT ?
+                    );
+                """,
+                    (name, name, self.maxsize),
+                )
+
+    def delete(self, name: str, key: Hashable) -> None:
+        con = self._connection()
+        with con:
+            con.execute(
+                "DELETE FROM cache WHERE name = ? AND key = ?;",
+                (name, canonical_key(key)),
+            )
+
+    def size(self, name: str) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM cache WHERE name = ?;", (name,)
+        ).fetchone()[0]
+
+    def clear(self, name: str) -> None:
+        con = self._connection()
+        with con:
+            con.execute("DELETE FROM cache WHERE name = ?;", (name,))
+
+
+class RedisBackend(CacheBackend):
+    """Cache in Redis, shared by every process that can reach it.
+
+    Uses the connection of the process's RedisChannel (queuer.get_redis_channel) by
+    default.  Each entry is its own key, and entries with an expiry are also expired
+    by Redis.  There's no maxsize; bound memory with Redis' maxmemory-policy.
+    """
+
+    def __init__(self, r: Optional[redis.Redis] = None):
+        if r is None:
+            from . import queuer
+
+            r = queuer.get_redis_channel().r
+        self.r = r
+
+    def _redis_key(self, name: str, key: Hashable) -> str:
+        return f"{REDIS_KEY_PREFIX}:{name}:{canonical_key(key)}"
+
+    def _index_key(self, name: str) -> str:
+        # Tracks the keys for a function, so that it can be sized and cleared.
+        return f"{REDIS_KEY_PREFIX}:{name}"
+
+    def get(self, name: str, key: Hashable) -> Optional[CacheEntry]:
+        value = self.r.get(self._redis_key(name, key))
+        if value is None:
+            return None
+        return pickle.loads(value)
+
+    def set(self, name: str, key: Hashable, entry: CacheEntry) -> None:
+        redis_key = self._redis_key(name, key)
+        _, expiry = entry
+        pipe = self.r.pipeline(transaction=False)
+        if expiry is None:
+            pipe.set(redis_key, _dumps(entry))
+        else:
+            px = max(1, int((expiry - time.time()) * 1000))
+            pipe.set(redis_key, _dumps(entry), px=px)
+        pipe.sadd(self._index_key(name), redis_key)
+        pipe.execute()
+
+    def delete(self, name: str, key: Hashable) -> None:
+        redis_key = self._redis_key(name, key)
+        pipe = self.r.pipeline(transaction=False)
+        pipe.delete(redis_key)
+        pipe.srem(self._index_key(name), redis_key)
+        pipe.execute()
+
+    def size(self, name: str) -> int:
+        # Drop keys that Redis expired, so they aren't counted.
+        index_key = self._index_key(name)
+        redis_keys = list(self.r.smembers(index_key))
+        if not redis_keys:
+            return 0
+        exists = self.r.pipeline(transaction=False)
+        for redis_key in redis_keys:
+            exists.exists(redis_key)
+        gone = [k for k, e in zip(redis_keys, exists.execute()) if not e]
+        if gone:
+            self.r.srem(index_key, *gone)
+        return len(redis_keys) - len(gone)
+
+    def clear(self, name: str) -> None:
+        index_key = self._index_key(name)
+        redis_keys = list(self.r.smembers(index_key))
+        if redis_keys:
+            self.r.delete(*redis_keys)
+        self.r.delete(index_key)
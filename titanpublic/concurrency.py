@@ -0,0 +1,62 @@
+"""Helpers for running callbacks off of the consumer thread."""
+
+import collections
+import concurrent.futures
+from typing import Any, Deque, List, Optional, Tuple
+
+
+EXECUTOR_MODES = ("thread", "process")
+
+
+def build_executor(
+    mode: Optional[str], max_workers: int
+) -> Optional[concurrent.futures.Executor]:
+    """Build an executor for callbacks.
+
+    Use "thread" for I/O-bound callbacks and "process" for CPU-bound ones.  Process
+    mode requires the callback and its arguments to be picklable.  A mode of None
+    means run callbacks inline, and returns None.
+    """
+    if mode is None:
+        return None
+    if "thread" == mode:
+        return concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    if "process" == mode:
+        return concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+    raise ValueError(f"Executor mode {mode} must be one of {EXECUTOR_MODES}")
+
+
+class OrderedFutures(object):
+    """Bounded set of in-flight futures, released in submission order.
+
+    Futures are only popped from the head, so results are handled (and messages can
+    be acked) in the order they were consumed, even if they finish out of order.
+    """
+
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self._futures: Deque[Tuple[Any, concurrent.futures.Future]] = (
+            collections.deque()
+        )
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def full(self) -> bool:
+        return len(self._futures) >= self.max_in_flight
+
+    def add(self, context: Any, future: concurrent.futures.Future) -> None:
+        self._futures.append((context, future))
+
+    def pop_done(self) -> List[Tuple[Any, concurrent.futures.Future]]:
+        """Pop the finished futures at the head, stopping at the first unfinished."""
+        result = list()
+        while self._futures and self._futures[0][1].done():
+            result.append(self._futures.popleft())
+        return result
+
+    def pop_head(self) -> Tuple[Any, concurrent.futures.Future]:
+        """Wait for the oldest future to finish, and pop it."""
+        context, future = self._futures.popleft()
+        concurrent.futures.wait([future])
+        return context, future
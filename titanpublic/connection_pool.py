@@ -0,0 +1,211 @@
+"""Process-wide pool of MySQL connections to Titan's DB."""
+
+import collections
+import contextlib
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, ContextManager, Deque, Dict, Iterator, Tuple
+
+import attr
+import MySQLdb
+
+
+PORT = 3306
+POOL_MAX_SIZE = 8  # Max open connections per pool, idle or checked out
+POOL_MAX_IDLE_SEC = 300  # Close connections that sat idle longer than this
+HEALTH_CHECK_AFTER_SEC = 30  # Ping connections that sat idle longer than this
+CHECKOUT_TIMEOUT_SEC = 60  # How long to wait for a free connection
+
+# (host, port, user, db, digest of the password)
+PoolKey = Tuple[str, int, str, str, str]
+
+
+@attr.s
+class PoolStats(object):
+    hits: int = attr.ib(default=0)
+    misses: int = attr.ib(default=0)
+    reconnects: int = attr.ib(default=0)
+    evictions: int = attr.ib(default=0)
+
+
+class ConnectionPool(object):
+    """A bounded pool of connections to a single database.
+
+    Connections are health checked (ping) on checkout if they've been idle a while,
+    and replaced if the check fails.  Any connection that raises a MySQL error while
+    checked out is closed rather than returned to the pool.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        db: str,
+        max_size: int = POOL_MAX_SIZE,
+        max_idle_sec: float = POOL_MAX_IDLE_SEC,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.db = db
+        self.max_size = max_size
+        self.max_idle_sec = max_idle_sec
+
+        self.stats = PoolStats()
+
+        # (connection, last used monotonic time), most recently used at the end.
+        self._idle: Deque[Tuple[Any, float]] = collections.deque()
+        self._num_open = 0
+        self._cv = threading.Condition()
+
+    def _connect(self) -> Any:
+        return MySQLdb.connect(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+            passwd=self.password,
+            db=self.db,
+        )
+
+    @staticmethod
+    def _close_quietly(con: Any) -> None:
+        try:
+            con.close()
+        except Exception:
+            pass
+
+    def _evict_idle(self, now: float) -> None:
+        """Must hold self._cv"""
+        # Oldest are at the front.
+        while self._idle and now - self._idle[0][1] > self.max_idle_sec:
+            con, _ = self._idle.popleft()
+            self._num_open -= 1
+            self.stats.evictions += 1
+            self._close_quietly(con)
+
+    def _checkout(self) -> Any:
+        deadline = time.monotonic() + CHECKOUT_TIMEOUT_SEC
+        with self._cv:
+            while True:
+                now = time.monotonic()
+                self._evict_idle(now)
+                if self._idle:
+                    con, last_used = self._idle.pop()
+                    self.stats.hits += 1
+                    break
+                if self._num_open < self.max_size:
+                    # Reserve a slot, then connect outside of the lock.
+                    self._num_open += 1
+                    self.stats.misses += 1
+                    con, last_used = None, None
+                    break
+                if not self._cv.wait(timeout=max(0, deadline - now)):
+                    raise TimeoutError(f"No free connection to {self.db} in pool")
+
+        if con is None:
+            try:
+                return self._connect()
+            except Exception:
+                self._release_slot()
+                raise
+
+        if time.monotonic() - last_used > HEALTH_CHECK_AFTER_SEC:
+            try:
+                con.ping()
+            except MySQLdb.Error:
+                logging.debug(f"Stale pooled connection to {self.db}, reconnecting")
+                self._close_quietly(con)
+                with self._cv:
+                    self.stats.reconnects += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+        return con
+
+    def _checkin(self, con: Any) -> None:
+        try:
+            # End any open transaction, so the next user doesn't read a stale snapshot.
+            con.rollback()
+        except MySQLdb.Error:
+            self._discard(con)
+            return
+        with self._cv:
+            self._idle.append((con, time.monotonic()))
+            self._cv.notify()
+
+    def _discard(self, con: Any) -> None:
+        self._close_quietly(con)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        with self._cv:
+            self._num_open -= 1
+            self._cv.notify()
+
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[Any]:
+        con = self._checkout()
+        try:
+            yield con
+        except MySQLdb.Error:
+            # Assume the connection is broken; the next checkout will reconnect.
+            self._discard(con)
+            raise
+        except BaseException:
+            self._checkin(con)
+            raise
+        else:
+            self._checkin(con)
+
+    def close(self) -> None:
+        with self._cv:
+            while self._idle:
+                con, _ = self._idle.popleft()
+                self._num_open -= 1
+                self._close_quietly(con)
+
+
+_pools: Dict[PoolKey, ConnectionPool] = dict()
+_pools_pid = os.getpid()
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name: str, secrets: Dict[str, Any]) -> ConnectionPool:
+    """Returns the process-wide pool for this database, creating it if needed."""
+    global _pools, _pools_pid
+
+    # Key on a digest of the password, so rotated secrets get a fresh pool without
+    #  keeping the password itself in pool_stats.
+    password_digest = hashlib.sha256(secrets["aws_password"].encode()).hexdigest()
+    key = (secrets["aws_host"], PORT, secrets["aws_username"], db_name, password_digest)
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # We've been forked, and can't share sockets with the parent.
+            _pools, _pools_pid = dict(), os.getpid()
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                host=secrets["aws_host"],
+                port=PORT,
+                user=secrets["aws_username"],
+                password=secrets["aws_password"],
+                db=db_name,
+            )
+        return _pools[key]
+
+
+def connection(db_name: str, secrets: Dict[str, Any]) -> ContextManager[Any]:
+    """Check out a pooled connection to db_name, for use in a with statement."""
+    return get_pool(db_name, secrets).connection()
+
+
+def pool_stats() -> Dict[PoolKey, PoolStats]:
+    with _pools_lock:
+        return {key: attr.evolve(pool.stats) for key, pool in _pools.items()}
@@ -2,6 +2,8 @@ import datetime
 from typing import List, Optional, Tuple
 import warnings
 
+import numpy as np
+
 from . import shared_types
 
 
@@ -146,3 +148,87 @@ def approx_season_start(date: shared_types.Date, sport: str) -> shared_types.Dat
     if "ncaaf" == sport:
         return year * 10000 + 1106
     raise NotImplementedError(f"Sport {sport} is not supported for year model.")
+
+
+# Vectorized versions, for labeling whole columns of dates at once.  Each takes an
+#  array-like of int YYYYMMDD dates and returns int64 arrays, matching the scalar
+#  function of the same name element by element.
+
+
+def _to_datetime64(dates: np.ndarray) -> np.ndarray:
+    year, month_day = np.divmod(dates, 10000)
+    month, day = np.divmod(month_day, 100)
+    months = (year - 1970) * 12 + (month - 1)
+    return months.astype("datetime64[M]").astype("datetime64[D]") + (day - 1)
+
+
+def _from_datetime64(dts: np.ndarray) -> np.ndarray:
+    months = dts.astype("datetime64[M]")
+    year, month = np.divmod(months.astype(np.int64), 12)
+    day = (dts - months.astype("datetime64[D]")).astype(np.int64) + 1
+    return (year + 1970) * 10000 + (month + 1) * 100 + day
+
+
+def _current_year_start_array(dates, sport: str) -> np.ndarray:
+    if sport in ("ncaam", "ncaaw", "ncaaf"):
+        cutoff = 630
+    else:
+        raise NotImplementedError(f"Sport {sport} is not supported.")
+
+    year, month_day = np.divmod(np.asarray(dates, dtype=np.int64), 10000)
+    year = np.where(month_day <= cutoff, year - 1, year)
+    return year * 10000 + cutoff
+
+
+def season_year_label_array(dates, sport: str = "ncaam") -> np.ndarray:
+    year, month_day = np.divmod(np.asarray(dates, dtype=np.int64), 10000)
+    if sport in ("ncaam", "ncaaw"):
+        return np.where(month_day > 630, year + 1, year)
+    if "ncaaf" == sport:
+        return np.where(month_day < 630, year - 1, year)
+    raise NotImplementedError(f"Sport {sport} is not supported for year model.")
+
+
+def previous_years_array(
+    dates, years_back: int, sport: str = "ncaam"
+) -> Tuple[np.ndarray, np.ndarray]:
+    en = _current_year_start_array(dates, sport)
+    return (en - 10000 * years_back, en)
+
+
+def previous_year_array(dates, sport: str = "ncaam") -> Tuple[np.ndarray, np.ndarray]:
+    return previous_years_array(dates, 1, sport=sport)
+
+
+def current_year_array(dates, sport: str = "ncaam") -> Tuple[np.ndarray, np.ndarray]:
+    st = _current_year_start_array(dates, sport)
+    return (st, st + 10000)
+
+
+def current_year_through_week_array(
+    dates, sport: str = "ncaam"
+) -> Tuple[np.ndarray, np.ndarray]:
+    dates = np.asarray(dates, dtype=np.int64)
+    st = _current_year_start_array(dates, sport)
+
+    yesterday = _to_datetime64(dates) - 1
+    # 1970-01-01 was a Thursday, which is weekday 3.
+    weekday = (yesterday.astype(np.int64) + 3) % 7
+    return (st, _from_datetime64(yesterday - weekday))
+
+
+def current_year_through_yesterday_array(
+    dates, sport: str = "ncaam"
+) -> Tuple[np.ndarray, np.ndarray]:
+    dates = np.asarray(dates, dtype=np.int64)
+    st = _current_year_start_array(dates, sport)
+    return (st, _from_datetime64(_to_datetime64(dates) - 1))
+
+
+def approx_season_start_array(dates, sport: str) -> np.ndarray:
+    year = _current_year_start_array(dates, sport) // 10000
+    if sport in ("ncaam", "ncaaw"):
+        return year * 10000 + 825
+    if "ncaaf" == sport:
+        return year * 10000 + 1106
+    raise NotImplementedError(f"Sport {sport} is not supported for year model.")
@@ -0,0 +1,129 @@
+"""Manual acking and prefetch sizing for Rabbit consumers."""
+
+import time
+from typing import Optional
+
+
+ACK_BATCH_SIZE = 50  # Most deliveries to settle with a single multiple=True ack
+ACK_MAX_DELAY_SEC = 1  # Most time to hold an ack before sending it
+MIN_PREFETCH = 1
+MAX_PREFETCH = 1000
+TARGET_BUFFER_SEC = 5  # Aim to hold about this much work in the prefetch window
+LATENCY_EWMA_ALPHA = 0.2  # Weight of the newest latency in the running average
+PREFETCH_CHANGE_RATIO = 1.25  # Only change prefetch when it moves by this factor
+
+
+class AckBatcher(object):
+    """Acks deliveries in batches, with basic_ack(multiple=True).
+
+    Deliveries must be acked in the order they were delivered, since acking a tag
+    with multiple=True also acks every earlier tag on the channel.  Acks for a closed
+    channel are dropped; the broker will redeliver those messages.
+    """
+
+    def __init__(
+        self,
+        channel,
+        batch_size: int = ACK_BATCH_SIZE,
+        max_delay_sec: float = ACK_MAX_DELAY_SEC,
+    ):
+        self.channel = channel
+        self.batch_size = batch_size
+        self.max_delay_sec = max_delay_sec
+
+        self.delivered = 0
+        self.acked = 0
+        self._pending_tag: Optional[int] = None
+        self._pending = 0
+        self._pending_since: Optional[float] = None
+
+    @property
+    def unacked(self) -> int:
+        """Messages delivered to us that the broker hasn't got an ack for yet."""
+        return self.delivered - self.acked
+
+    def deliver(self) -> None:
+        """Call on each delivery."""
+        self.delivered += 1
+
+    def ack(self, delivery_tag: int) -> None:
+        if not self.channel.is_open:
+            return
+        self._pending_tag = delivery_tag
+        self._pending += 1
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        if (
+            self._pending >= self.batch_size
+            or time.monotonic() - self._pending_since >= self.max_delay_sec
+        ):
+            self.flush()
+
+    def nack(self, delivery_tag: int, requeue: bool = True) -> None:
+        if not self.channel.is_open:
+            return
+        self.flush()
+        self.channel.basic_nack(delivery_tag=delivery_tag, requeue=requeue)
+        self.acked += 1
+
+    def flush(self) -> None:
+        """Send any pending acks now.  Call this periodically, in case we go idle."""
+        if self._pending_tag is None or not self.channel.is_open:
+            return
+        self.channel.basic_ack(delivery_tag=self._pending_tag, multiple=True)
+        self.acked += self._pending
+        self._pending_tag = None
+        self._pending = 0
+        self._pending_since = None
+
+
+class AdaptivePrefetch(object):
+    """Sizes prefetch from observed callback latency.
+
+    With manual acks, prefetch bounds how many messages we hold at once.  We aim to
+    hold about target_buffer_sec of work: enough to keep parallelism workers busy,
+    but not so much that a crash or a slow model strands a big window of messages.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        parallelism: int = 1,
+        target_buffer_sec: float = TARGET_BUFFER_SEC,
+        min_prefetch: int = MIN_PREFETCH,
+        max_prefetch: int = MAX_PREFETCH,
+    ):
+        self.prefetch = initial
+        self.parallelism = parallelism
+        self.target_buffer_sec = target_buffer_sec
+        self.min_prefetch = min_prefetch
+        self.max_prefetch = max_prefetch
+        self.latency_sec: Optional[float] = None
+
+    def observe(self, latency_sec: float) -> Optional[int]:
+        """Record one message's latency.
+
+        Returns:
+            The new prefetch, if it should be changed.  Otherwise None.
+        """
+        if self.latency_sec is None:
+            self.latency_sec = latency_sec
+        else:
+            self.latency_sec = (
+                LATENCY_EWMA_ALPHA * latency_sec
+                + (1 - LATENCY_EWMA_ALPHA) * self.latency_sec
+            )
+
+        target = self.parallelism * self.target_buffer_sec / max(self.latency_sec, 1e-3)
+        target = int(min(self.max_prefetch, max(self.min_prefetch, target)))
+        if (
+            target >= self.prefetch * PREFETCH_CHANGE_RATIO
+            or target * PREFETCH_CHANGE_RATIO <= self.prefetch
+        ):
+            self.prefetch = target
+            return target
+        return None
+
+    def ack_batch_size(self) -> int:
+        """An ack batch must be well under prefetch, or the broker stops sending."""
+        return max(1, min(ACK_BATCH_SIZE, self.prefetch // 2))
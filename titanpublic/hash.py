@@ -1,14 +1,57 @@
+import functools
 import hashlib
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
 
 from . import shared_types
 
 
+HASH_MEMO_SIZE = 2**16  # Team names and dates repeat a lot.
+
+
 def myhash(s):
     s = str(s)
     return int(hashlib.sha256(s.encode()).hexdigest(), 16) % (2**63)
 
 
+@functools.lru_cache(maxsize=HASH_MEMO_SIZE)
+def _memo_hash(s: str) -> int:
+    return myhash(s)
+
+
 def game_hash(
     away: shared_types.TeamName, home: shared_types.TeamName, date: shared_types.Date
 ):
     return myhash(away) ^ myhash(home) ^ myhash(date)
+
+
+def _component_hashes(values: Iterable) -> np.ndarray:
+    """myhash for each value, hashing each distinct value once."""
+    # An object array keeps each value's own type, so a mixed column of ints and
+    #  floats hashes each value as game_hash would, instead of promoting to float.
+    values = np.asarray(values, dtype=object)
+    codes, uniques = pd.factorize(values)
+    # myhash is below 2**63, so fits in an int64.
+    unique_hashes = np.fromiter(
+        (_memo_hash(str(u)) for u in uniques), dtype=np.int64, count=len(uniques)
+    )
+    hashes = unique_hashes[codes]
+    # factorize codes None and NaN as -1, so hash those as they are.
+    missing = np.flatnonzero(codes == -1)
+    hashes[missing] = [_memo_hash(str(v)) for v in values[missing]]
+    return hashes
+
+
+def game_hashes(
+    away: Iterable[shared_types.TeamName],
+    home: Iterable[shared_types.TeamName],
+    date: Iterable[shared_types.Date],
+) -> np.ndarray:
+    """game_hash for many games at once.
+
+    Takes arrays (or lists / Series) of equal length, and returns an int64 array that
+    is identical to calling game_hash on each (away, home, date).
+    """
+    return _component_hashes(away) ^ _component_hashes(home) ^ _component_hashes(date)
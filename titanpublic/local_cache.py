@@ -0,0 +1,196 @@
+"""A persistent local cache for pull_data, stored as Parquet files.
+
+Results are stored per (db_name, table, season), where table is games or a feature.
+Each call refreshes the seasons it touches, pulling only rows whose timestamp /
+output_timestamp is at least the newest one already cached.  Rows deleted from
+Titan are not noticed, so clear the cache directory if that happens.
+
+Requires pyarrow (pip install titanpublic[cache]), or fastparquet, for pandas'
+Parquet support.
+"""
+
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from . import connection_pool
+from . import payloads
+from . import pull_data
+from . import shared_types
+
+
+# Seasons are cached as [YYYY0630, (YYYY+1)0630), which works for all our sports.
+SEASON_CUTOFF = 630
+
+
+def _season_start(date: shared_types.Date) -> shared_types.Date:
+    year, month_day = divmod(date, 10000)
+    if month_day < SEASON_CUTOFF:
+        year -= 1
+    return year * 10000 + SEASON_CUTOFF
+
+
+def _seasons(
+    min_date: shared_types.Date, max_date: shared_types.Date
+) -> List[Tuple[shared_types.Date, shared_types.Date]]:
+    """Seasons overlapping [min_date, max_date)"""
+    result = list()
+    if min_date >= max_date:
+        return result
+    st = _season_start(min_date)
+    while st < max_date:
+        result.append((st, st + 10000))
+        st += 10000
+    return result
+
+
+class LocalCache(object):
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _path(self, db_name: str, table: str, season_st: shared_types.Date) -> str:
+        return os.path.join(self.cache_dir, db_name, table, f"{season_st}.parquet")
+
+    @staticmethod
+    def _load(path: str) -> Optional[pd.DataFrame]:
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    @staticmethod
+    def _save(df: pd.DataFrame, path: str) -> None:
+        # Write then rename, so that readers never see a partial file.
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except:
+            os.remove(tmp_path)
+            raise
+
+    def _refresh(self, con: Any, path: str, ts_column: str, query: str) -> pd.DataFrame:
+        """Bring the cached partition at path up to date.
+
+        query must be a format string with a {since} field, and pull all rows of the
+        partition with ts_column >= since.  We use >= so that rows written in the
+        same second as our last pull aren't missed; repeats are deduped.
+        """
+        cached = self._load(path)
+        since = 0
+        if cached is not None and not cached.empty:
+            since = int(cached[ts_column].max())
+
+        delta = pd.read_sql_query(query.format(since=since), con)
+        if cached is None:
+            df = delta
+        elif delta.empty:
+            return cached
+        else:
+            df = pd.concat([cached, delta], ignore_index=True)
+            df = df.drop_duplicates("game_hash", keep="last", ignore_index=True)
+
+        self._save(df, path)
+        return df
+
+    def games(
+        self,
+        con: Any,
+        db_name: str,
+        season: Tuple[shared_types.Date, shared_types.Date],
+    ) -> pd.DataFrame:
+        st, en = season
+        query = pull_data._games_query(
+            db_name, f"date >= {st} AND date < {en} AND timestamp >= {{since}}"
+        )
+        return self._refresh(con, self._path(db_name, "games", st), "timestamp", query)
+
+    def feature(
+        self,
+        con: Any,
+        db_name: str,
+        feature: str,
+        target_field: str,
+        season: Tuple[shared_types.Date, shared_types.Date],
+    ) -> pd.DataFrame:
+        st, en = season
+        query = pull_data._feature_query(
+            db_name,
+            feature,
+            target_field,
+            f"games.date >= {st} AND games.date < {en} "
+            f"AND {feature}.output_timestamp >= {{since}}",
+        )
+        path = self._path(db_name, f"{feature}.{target_field}", st)
+        return self._refresh(con, path, f"{feature}_ts", query)
+
+
+def pull_data_cached(
+    db_name: str,
+    features: Tuple[str, ...],
+    min_date: int,
+    max_date: int,
+    secrets: Dict[str, Any],
+    cache_dir: str,
+    pull_payload: bool = False,
+    payload_keys: Optional[Tuple[str, ...]] = None,
+) -> Tuple[pd.DataFrame, int]:
+    """Same as pull_data, but through a local cache in cache_dir.
+
+    Every season overlapping [min_date, max_date) is cached whole, so later pulls
+    anywhere in those seasons only fetch the rows that changed.
+
+    With payload_keys, whole payloads are cached, and the keys are extracted locally
+    into the same {feature}_{key} columns that pull_data returns.
+
+    Returns:
+        df: The results in a dataframe, with the same columns as pull_data.
+        max_timestamp: The maximum timestamp over all consumed data.  Needed for titan.
+    """
+    payload_keys = payloads.check_keys(payload_keys)
+    target_field = "payload" if pull_payload or payload_keys else "value"
+    cache = LocalCache(cache_dir)
+
+    keep_column_names = [c for c in pull_data.GAMES_COLUMNS if c != "timestamp"]
+    seasons = _seasons(min_date, max_date)
+    if not seasons:
+        for feature in features:
+            if payload_keys:
+                keep_column_names.extend(
+                    pull_data._payload_key_columns(feature, payload_keys)
+                )
+            else:
+                keep_column_names.append(feature)
+        return pd.DataFrame(columns=keep_column_names), 0
+
+    games_parts = list()
+    feature_parts: Dict[str, List[pd.DataFrame]] = {f: list() for f in features}
+    with connection_pool.connection(db_name, secrets) as con:
+        for season in seasons:
+            games_parts.append(cache.games(con, db_name, season))
+            for feature in features:
+                feature_parts[feature].append(
+                    cache.feature(con, db_name, feature, target_field, season)
+                )
+
+    df = pd.concat(games_parts, ignore_index=True)
+    df = df[(df["date"] >= min_date) & (df["date"] < max_date)].reset_index(drop=True)
+    ts_columns = ["timestamp"]
+    for feature in features:
+        pull_data._attach_feature(
+            df, pd.concat(feature_parts[feature], ignore_index=True), feature
+        )
+        ts_columns.append(f"{feature}_ts")
+
+    max_timestamp = 0
+    for col in ts_columns:
+        max_timestamp = max(max_timestamp, df[col].max())
+
+    keep_column_names.extend(features)
+    df = df[keep_column_names]
+    if payload_keys:
+        df = payloads.extract_keys(df, features, payload_keys)
+    return df, max_timestamp
@@ -0,0 +1,203 @@
+"""Encoding for titan queue messages.
+
+Jobs for the pods have been space-separated text:
+
+    sport model_name input_timestamp away home date neutral
+
+where input_timestamp may be several timestamps joined with commas.  The binary
+format packs many jobs into one broker message (an envelope):
+
+    header: MAGIC, VERSION, kind, count
+    each job: sport, model_name, away, home as length-prefixed utf-8, then date,
+        neutral, and the input timestamps as a count followed by uint32s.
+
+Notification envelopes hold (job, output_timestamp, status) for each job.
+
+A text message never starts with MAGIC, so decode_bodies accepts either format.
+"""
+
+import struct
+from typing import Iterable, List, Tuple, Union
+
+import attr
+
+from . import shared_types
+
+
+MAGIC = b"\x00"  # First byte of every binary message
+VERSION = 1
+KIND_JOBS = 1
+KIND_NOTIFICATIONS = 2
+STATUSES = ("success", "failure", "critical")  # Notification statuses, by code
+
+FORMATS = ("text", "binary")
+
+_HEADER = struct.Struct(">cBBI")  # magic, version, kind, count
+_STR_LEN = struct.Struct(">B")
+_JOB_FIELDS = struct.Struct(">IBB")  # date, neutral, number of timestamps
+_TIMESTAMP = struct.Struct(">I")  # Unix seconds
+_NOTIFICATION_FIELDS = struct.Struct(">IB")  # output_timestamp, status code
+
+
+@attr.s(frozen=True)
+class Job(object):
+    sport: str = attr.ib()
+    model_name: str = attr.ib()
+    # Usually one timestamp, but may be many
+    input_timestamps: Tuple[int, ...] = attr.ib(converter=tuple)
+    away: shared_types.TeamName = attr.ib()
+    home: shared_types.TeamName = attr.ib()
+    date: shared_types.Date = attr.ib()
+    neutral: int = attr.ib()
+
+    @property
+    def input_timestamp(self) -> str:
+        """The timestamps as they appear in the text format."""
+        return ",".join(str(ts) for ts in self.input_timestamps)
+
+    @classmethod
+    def from_text(cls, body: str) -> "Job":
+        (sport, model_name, input_timestamp, away, home, date, neutral,) = body.split()
+        return cls(
+            sport,
+            model_name,
+            [int(ts) for ts in input_timestamp.split(",")],
+            away,
+            home,
+            int(date),
+            int(neutral),
+        )
+
+    def to_text(self) -> str:
+        return " ".join(
+            [
+                self.sport,
+                self.model_name,
+                self.input_timestamp,
+                self.away,
+                self.home,
+                str(self.date),
+                str(self.neutral),
+            ]
+        )
+
+
+def is_binary(body: Union[bytes, str]) -> bool:
+    return isinstance(body, bytes) and body[:1] == MAGIC
+
+
+def _pack_str(s: str) -> bytes:
+    encoded = s.encode()
+    if len(encoded) > 255:
+        raise ValueError(f"String too long to encode: {s}")
+    return _STR_LEN.pack(len(encoded)) + encoded
+
+
+def _unpack_str(body: bytes, offset: int) -> Tuple[str, int]:
+    (length,) = _STR_LEN.unpack_from(body, offset)
+    offset += _STR_LEN.size
+    return body[offset : offset + length].decode(), offset + length
+
+
+def _pack_job(job: Job) -> bytes:
+    parts = [
+        _pack_str(job.sport),
+        _pack_str(job.model_name),
+        _pack_str(job.away),
+        _pack_str(job.home),
+        _JOB_FIELDS.pack(job.date, job.neutral, len(job.input_timestamps)),
+    ]
+    parts.extend(_TIMESTAMP.pack(ts) for ts in job.input_timestamps)
+    return b"".join(parts)
+
+
+def _unpack_job(body: bytes, offset: int) -> Tuple[Job, int]:
+    sport, offset = _unpack_str(body, offset)
+    model_name, offset = _unpack_str(body, offset)
+    away, offset = _unpack_str(body, offset)
+    home, offset = _unpack_str(body, offset)
+    date, neutral, num_timestamps = _JOB_FIELDS.unpack_from(body, offset)
+    offset += _JOB_FIELDS.size
+    input_timestamps = struct.unpack_from(f">{num_timestamps}I", body, offset)
+    offset += _TIMESTAMP.size * num_timestamps
+    return Job(sport, model_name, input_timestamps, away, home, date, neutral), offset
+
+
+def _unpack_header(body: bytes, kind: int) -> Tuple[int, int]:
+    """Check the header, and return the count and the offset past the header."""
+    magic, version, body_kind, count = _HEADER.unpack_from(body, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a binary titan message")
+    if version != VERSION:
+        raise ValueError(f"Unsupported message version {version}")
+    if body_kind != kind:
+        raise ValueError(f"Expected message kind {kind}, got {body_kind}")
+    return count, _HEADER.size
+
+
+def encode_jobs(jobs: Iterable[Job]) -> bytes:
+    """Pack many jobs into one binary message."""
+    packed = [_pack_job(job) for job in jobs]
+    return _HEADER.pack(MAGIC, VERSION, KIND_JOBS, len(packed)) + b"".join(packed)
+
+
+def decode_jobs(body: Union[bytes, str]) -> List[Job]:
+    """The jobs in a message, which may be binary or text."""
+    if not is_binary(body):
+        if isinstance(body, bytes):
+            body = body.decode()
+        return [Job.from_text(body)]
+
+    count, offset = _unpack_header(body, KIND_JOBS)
+    jobs = list()
+    for _ in range(count):
+        job, offset = _unpack_job(body, offset)
+        jobs.append(job)
+    return jobs
+
+
+def decode_bodies(body: Union[bytes, str]) -> List[str]:
+    """The text body of each job in a message, which may be binary or text.
+
+    A text message is returned unchanged, so existing pods see exactly the bodies
+    they always have.
+    """
+    if not is_binary(body):
+        if isinstance(body, bytes):
+            body = body.decode()
+        return [body]
+    return [job.to_text() for job in decode_jobs(body)]
+
+
+def encode_notifications(notifications: Iterable[Tuple[str, int, str]]) -> bytes:
+    """Pack (input_body, output_timestamp, status) notifications into one message."""
+    packed = list()
+    for input_body, output_timestamp, status in notifications:
+        packed.append(
+            _pack_job(Job.from_text(input_body))
+            + _NOTIFICATION_FIELDS.pack(output_timestamp, STATUSES.index(status))
+        )
+    return _HEADER.pack(MAGIC, VERSION, KIND_NOTIFICATIONS, len(packed)) + b"".join(
+        packed
+    )
+
+
+def decode_notifications(body: Union[bytes, str]) -> List[Tuple[Job, int, str]]:
+    """(job, output_timestamp, status) for each notification in a message.
+
+    Also accepts a text notification, "{input_body} {output_timestamp} {status}".
+    """
+    if not is_binary(body):
+        if isinstance(body, bytes):
+            body = body.decode()
+        input_body, output_timestamp, status = body.rsplit(" ", 2)
+        return [(Job.from_text(input_body), int(output_timestamp), status)]
+
+    count, offset = _unpack_header(body, KIND_NOTIFICATIONS)
+    notifications = list()
+    for _ in range(count):
+        job, offset = _unpack_job(body, offset)
+        output_timestamp, status = _NOTIFICATION_FIELDS.unpack_from(body, offset)
+        offset += _NOTIFICATION_FIELDS.size
+        notifications.append((job, output_timestamp, STATUSES[status]))
+    return notifications
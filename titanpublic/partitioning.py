@@ -0,0 +1,72 @@
+"""Consistent hashing of games onto shard queues, and of shards onto workers."""
+
+import bisect
+import functools
+import os
+import socket
+from typing import Iterable, List
+
+from . import hash
+
+
+VIRTUAL_NODES = 64  # Points per node on the hash ring, to even out the load
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def shard_queue_id(queue_id: str, shard: int) -> str:
+    """The queue id for one shard of a partitioned queue."""
+    return f"{queue_id}-shard{shard}"
+
+
+class ConsistentHashRing(object):
+    """Maps keys onto nodes, so that few keys move when nodes are added or removed."""
+
+    def __init__(self, nodes: Iterable[str], virtual_nodes: int = VIRTUAL_NODES):
+        points = sorted(
+            (hash.myhash(f"{node}#{i}"), node)
+            for node in nodes
+            for i in range(virtual_nodes)
+        )
+        if not points:
+            raise ValueError("Hash ring needs at least one node")
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: int) -> str:
+        """The first node clockwise from key."""
+        i = bisect.bisect_right(self._hashes, key) % len(self._hashes)
+        return self._nodes[i]
+
+
+@functools.lru_cache()
+def _shard_ring(num_shards: int) -> ConsistentHashRing:
+    return ConsistentHashRing(str(shard) for shard in range(num_shards))
+
+
+def shard_for(game_hash: int, num_shards: int) -> int:
+    """Which of num_shards shards a game belongs to.
+
+    All messages for a game go to the same shard, and changing num_shards moves
+    only about 1/num_shards of games.
+    """
+    return int(_shard_ring(num_shards).node_for(game_hash))
+
+
+def claim_shards(worker_id: str, workers: Iterable[str], num_shards: int) -> List[int]:
+    """The shards that worker_id should consume, given all live workers.
+
+    Every worker computes the same assignment from the same worker list, so each
+    shard has one consumer.  When workers come or go, only the shards of the workers
+    that changed move.  Uses rendezvous hashing, which balances well even with few
+    workers.
+    """
+    workers = sorted(set(workers) | {worker_id})
+    return [
+        shard
+        for shard in range(num_shards)
+        if worker_id
+        == max(workers, key=lambda worker: hash.myhash(f"{worker}#{shard}"))
+    ]
@@ -0,0 +1,113 @@
+"""Decoding feature payloads, the json blobs pulled with pull_payload=True.
+
+Uses orjson if it's installed (pip install titanpublic[payloads]), which is several
+times faster than json for many small documents.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Keys become part of column names and of JSON_EXTRACT paths in SQL.
+KEY_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+# {feature}_{key} can't be one of a feature's other columns.
+RESERVED_KEYS = ("ts",)
+
+
+def check_keys(payload_keys: Optional[Iterable[str]]) -> Optional[Tuple[str, ...]]:
+    """payload_keys as a tuple, or raises ValueError if any key isn't allowed."""
+    if payload_keys is None:
+        return None
+    if isinstance(payload_keys, str):
+        raise ValueError("payload_keys should be a sequence of keys, not a str")
+    payload_keys = tuple(payload_keys)
+    for key in payload_keys:
+        if not isinstance(key, str) or not KEY_PATTERN.fullmatch(key):
+            raise ValueError(f"Payload keys may only have letters, digits, _: {key!r}")
+        if key in RESERVED_KEYS:
+            raise ValueError(
+                f"Payload key {key!r} clashes with the {{feature}}_{key} column"
+            )
+    if len(set(payload_keys)) < len(payload_keys):
+        raise ValueError(f"Repeated payload keys: {payload_keys}")
+    return payload_keys
+
+
+def loads(s) -> Any:
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+
+def decode_many(values: Iterable[Optional[str]]) -> List[Any]:
+    """json-decode each value, passing through nulls."""
+    return [None if v is None or v != v else loads(v) for v in values]
+
+
+def _typed(values: List[Any], index: pd.Index) -> pd.Series:
+    # Let pandas infer the dtype, so numbers become numeric columns, with NaN for
+    #  missing values.
+    return pd.Series(values, index=index).infer_objects()
+
+
+def decode_json_columns(df: pd.DataFrame, columns: Iterable[str]) -> None:
+    """Decode columns of json scalars, like JSON_EXTRACT returns, into typed columns."""
+    for col in columns:
+        df[col] = _typed(decode_many(df[col]), df.index)
+
+
+class LazyPayloads(Sequence):
+    """A column of payloads, decoded the first time any of them is accessed.
+
+    Wraps a Series of json strings, so pulling payloads costs nothing until a caller
+    looks at them, and then the whole column is decoded in one batch.  Missing
+    payloads are None.
+    """
+
+    def __init__(self, raw: pd.Series):
+        self.raw = raw
+        self._decoded: Optional[List[Optional[Dict[str, Any]]]] = None
+
+    def _decode(self) -> List[Optional[Dict[str, Any]]]:
+        if self._decoded is None:
+            self._decoded = decode_many(self.raw)
+        return self._decoded
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __getitem__(self, i):
+        return self._decode()[i]
+
+    def column(self, key: str) -> pd.Series:
+        """Values of key across the payloads, as a typed Series on raw's index."""
+        return _typed(
+            [None if p is None else p.get(key) for p in self._decode()],
+            self.raw.index,
+        )
+
+
+def extract_keys(
+    df: pd.DataFrame, features: Iterable[str], payload_keys: Iterable[str]
+) -> pd.DataFrame:
+    """Replace each feature's payload column with {feature}_{key} columns.
+
+    This is the client-side version of pull_data's payload_keys, for payloads that
+    have already been pulled.
+    """
+    payload_keys = list(payload_keys)
+    for feature in features:
+        payloads = LazyPayloads(df[feature])
+        position = df.columns.get_loc(feature)
+        df = df.drop(columns=[feature])
+        for i, key in enumerate(payload_keys):
+            df.insert(position + i, f"{feature}_{key}", payloads.column(key))
+    return df
@@ -1,18 +1,27 @@
 """This contains some logic that helps with all the model pods."""
 
+import collections
 import logging
 import os
 import ssl
 import time
 import traceback
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import warnings
 
 import attr
 import pika
 import retrying
 
-from . import hash, pull_data, shared_logic, shared_types
+from . import (
+    concurrency,
+    flow_control,
+    hash,
+    messages,
+    pull_data,
+    shared_logic,
+    shared_types,
+)
 
 
 PREFETCH_COUNT = 100  # Minibatch size
@@ -42,6 +51,46 @@ class TitanConfig(object):
     inbound_channel: str = attr.ib()
     outbound_channel: str = attr.ib()
     suffixes: Optional[str] = attr.ib(default="")
+    # Micro-batching: Process up to batch_size messages together, waiting at most
+    #  batch_wait_ms for a batch to fill.  A batch_size of 1 turns this off.
+    batch_size: int = attr.ib(default=1)
+    batch_wait_ms: int = attr.ib(default=100)
+    # Run callbacks on a "thread" or "process" pool, with at most max_in_flight
+    #  running or waiting to be written.  None runs them on the consumer thread.
+    #  Can't be combined with batch_size or coalesce.
+    executor: Optional[str] = attr.ib(default=None)
+    max_workers: int = attr.ib(default=4)
+    max_in_flight: int = attr.ib(default=PREFETCH_COUNT)
+    # Ack messages once they're written and notified, instead of on delivery.  Acks
+    #  are batched, and prefetch adapts to how long messages take.
+    manual_ack: bool = attr.ib(default=False)
+    # Coalesce each batch: Run the model once per (model, game), for the newest
+    #  input_timestamp, and not at all if the DB already has that input_timestamp.
+    coalesce: bool = attr.ib(default=False)
+    # Notifications as "text" (one message each), or "binary" (see messages.py),
+    #  with one message per batch.  Inbound messages may be either.
+    output_format: str = attr.ib(
+        default="text", validator=attr.validators.in_(messages.FORMATS)
+    )
+
+    def __attrs_post_init__(self):
+        if self.executor is not None and (self.batch_size > 1 or self.coalesce):
+            raise ValueError(
+                "An executor runs each message on its own, so it can't be combined "
+                "with batch_size or coalesce"
+            )
+
+
+@attr.s
+class CoalesceStats(object):
+    received: int = attr.ib(default=0)  # Messages passed to process_messages
+    superseded: int = attr.ib(default=0)  # Had a newer message in the same batch
+    already_current: int = attr.ib(default=0)  # The DB had this input or newer
+    ran: int = attr.ib(default=0)  # Messages the model actually ran on
+
+    def saved(self) -> int:
+        """Model runs avoided by coalescing."""
+        return self.superseded + self.already_current
 
 
 def exchange_resolver(id: str, sport: str, env: str, suffixes: str = "") -> str:
@@ -84,7 +133,12 @@ def notify_titan(
     channel,
 ) -> None:
     warnings.warn("Please migrate to titan-common")
-    output_body = " ".join([input_body, str(output_timestamp), status,])
+    if "binary" == titan_config.output_format:
+        output_body = messages.encode_notifications(
+            [(input_body, output_timestamp, status)]
+        )
+    else:
+        output_body = " ".join([input_body, str(output_timestamp), status,])
     channel.basic_publish(
         exchange="",
         routing_key=routing_key_resolver(
@@ -95,10 +149,49 @@ def notify_titan(
     )
 
 
-def process_message(
-    body: str, callback: MessageCallback, titan_config: TitanConfig, channel
+def notify_titan_many(
+    notifications: List[Tuple[str, int, str]],
+    titan_config: TitanConfig,
+    channel,
 ) -> None:
+    """Publish many (input_body, output_timestamp, status) notifications together.
+
+    With binary output, these all go in a single message.
+    """
     warnings.warn("Please migrate to titan-common")
+    routing_key = routing_key_resolver(
+        titan_config.outbound_channel, titan_config.sport, titan_config.env
+    )
+    properties = pika.BasicProperties(delivery_mode=1)
+    if "binary" == titan_config.output_format:
+        if notifications:
+            channel.basic_publish(
+                exchange="",
+                routing_key=routing_key,
+                body=messages.encode_notifications(notifications),
+                properties=properties,
+            )
+        return
+    for input_body, output_timestamp, status in notifications:
+        output_body = " ".join([input_body, str(output_timestamp), status,])
+        channel.basic_publish(
+            exchange="",
+            routing_key=routing_key,
+            body=output_body,
+            properties=properties,
+        )
+
+
+def _run_callback(
+    body: str, callback: MessageCallback
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Parse a message and run the model on it.
+
+    Returns:
+        result: The payload to write, if the model ran or failed recurrently.
+        failure_status: If set, nothing should be written and titan should be
+            notified with this status.
+    """
     (sport, model_name, input_timestamp, away, home, date, neutral,) = body.split()
     date = int(date)
     neutral = int(neutral)
@@ -111,8 +204,7 @@ def process_message(
         full_msg = f"M_ERR_TAG::{model_name}:{type(err).__name__} - {body} - {str(err)}"
         # logging.error(traceback.format_exc())
         logging.error(full_msg)
-        notify_titan(body, 0, "failure", titan_config, channel)
-        return
+        return None, "failure"
     except shared_types.TitanRecurrentException as err:
         result = {"reason": type(err).__name__}
         full_msg = f"M_ERR_TAG::{model_name}:{type(err).__name__} - {body} - {str(err)}"
@@ -121,10 +213,66 @@ def process_message(
     except Exception as err:  # Includes TitanCriticalExceptions
         logging.error(traceback.format_exception(err))
         logging.error(f"Uncaught exception on {body}")
-        notify_titan(body, 0, "critical", titan_config, channel)
+        return None, "critical"
+
+    return result, None
+
+
+def _timed_run_callback(
+    body: str, callback: MessageCallback
+) -> Tuple[Tuple[Optional[Dict[str, Any]], Optional[str]], float]:
+    """_run_callback, and the seconds it took.  Module level, for process pools."""
+    start = time.monotonic()
+    outcome = _run_callback(body, callback)
+    return outcome, time.monotonic() - start
+
+
+class CallbackTimer(object):
+    """Totals time spent running model callbacks, for sizing prefetch.
+
+    Only the callbacks count, not time a message waits in the queue, a batch, or for
+    an executor worker.  Used on the consumer thread only.
+    """
+
+    def __init__(self):
+        self.sec = 0.0
+        self.calls = 0
+
+    def add(self, sec: float) -> None:
+        self.sec += sec
+        self.calls += 1
+
+    def wrap(self, callback: MessageCallback) -> MessageCallback:
+        def timed_callback(*args):
+            start = time.monotonic()
+            try:
+                return callback(*args)
+            finally:
+                self.add(time.monotonic() - start)
+
+        return timed_callback
+
+    def take_mean(self) -> Optional[float]:
+        """Mean seconds per callback since the last take, or None if none ran."""
+        if not self.calls:
+            return None
+        mean = self.sec / self.calls
+        self.sec = 0.0
+        self.calls = 0
+        return mean
+
+
+def process_message(
+    body: str, callback: MessageCallback, titan_config: TitanConfig, channel
+) -> None:
+    warnings.warn("Please migrate to titan-common")
+    result, failure_status = _run_callback(body, callback)
+    if failure_status is not None:
+        notify_titan(body, 0, failure_status, titan_config, channel)
         return
 
-    this_game_hash = hash.game_hash(away, home, date)
+    (_, model_name, input_timestamp, away, home, date, _,) = body.split()
+    this_game_hash = hash.game_hash(away, home, int(date))
     output_timestamp = pull_data.update_feature(
         database_resolver(titan_config.sport, titan_config.env),
         model_name,
@@ -144,13 +292,306 @@ def process_message(
     notify_titan(body, output_timestamp, "success", titan_config, channel)
 
 
+def process_messages(
+    bodies: List[str],
+    callback: MessageCallback,
+    titan_config: TitanConfig,
+    channel,
+    stats: Optional[CoalesceStats] = None,
+) -> None:
+    """Like process_message, but for a batch of messages.
+
+    Runs the callback on each message, writes all the results with one bulk write per
+    model, then publishes all the notifications.  Each message gets the same
+    notification that process_message would have sent it.
+
+    If titan_config.coalesce is set, the batch is coalesced first (see _coalesce).
+    Messages that weren't run get the notification of the message that replaced
+    them, or a success with the DB's output_timestamp if the DB was already current.
+    """
+    warnings.warn("Please migrate to titan-common")
+    if not titan_config.coalesce:
+        outcomes = [(body, *_run_callback(body, callback)) for body in bodies]
+        _finish_messages(outcomes, titan_config, channel)
+        return
+
+    if stats is None:
+        stats = CoalesceStats()
+    groups, current = _coalesce(bodies, titan_config, stats)
+
+    notifications: List[Optional[Tuple[str, int, str]]] = [None] * len(bodies)
+    for i, output_timestamp in current.items():
+        for j in groups[i]:
+            notifications[j] = (bodies[j], output_timestamp, "success")
+
+    to_run = [i for i in groups if i not in current]
+    outcomes = [(bodies[i], *_run_callback(bodies[i], callback)) for i in to_run]
+    written = _write_outcomes(outcomes, titan_config)
+    for i, (_, output_timestamp, status) in zip(to_run, written):
+        for j in groups[i]:
+            notifications[j] = (bodies[j], output_timestamp, status)
+
+    notify_titan_many(notifications, titan_config, channel)
+
+
+def _coalesce(
+    bodies: List[str], titan_config: TitanConfig, stats: CoalesceStats
+) -> Tuple[Dict[int, List[int]], Dict[int, int]]:
+    """Find which messages in a batch the model needs to run on.
+
+    For each (model, game), only the message with the newest input_timestamp (the
+    last of any ties) is kept.  A kept message is also dropped if the DB already
+    holds an input_timestamp at least as new, which is checked with one query per
+    model.
+
+    Returns:
+        groups: Index of each kept message -> indices of all the messages for its
+            (model, game), including itself.
+        current: Index of each kept message that the DB is already current for ->
+            the output_timestamp in the DB.
+    """
+    # (model_name, game_hash) -> index of the newest message
+    newest: Dict[Tuple[str, int], int] = dict()
+    keys: List[Tuple[str, int]] = list()
+    input_timestamps: List[int] = list()
+    for i, body in enumerate(bodies):
+        (_, model_name, input_timestamp, away, home, date, _,) = body.split()
+        key = (model_name, hash.game_hash(away, home, int(date)))
+        input_timestamp = int(pull_data._max_input_timestamp(input_timestamp))
+        keys.append(key)
+        input_timestamps.append(input_timestamp)
+        if key not in newest or input_timestamp >= input_timestamps[newest[key]]:
+            newest[key] = i
+
+    groups: Dict[int, List[int]] = {i: list() for i in newest.values()}
+    for i, key in enumerate(keys):
+        groups[newest[key]].append(i)
+
+    by_model: Dict[str, List[int]] = collections.defaultdict(list)
+    for (model_name, _), i in newest.items():
+        by_model[model_name].append(i)
+
+    current: Dict[int, int] = dict()
+    for model_name, indices in by_model.items():
+        existing = pull_data.feature_timestamps(
+            database_resolver(titan_config.sport, titan_config.env),
+            model_name,
+            [keys[i][1] for i in indices],
+            shared_logic.get_secrets(titan_config.secrets_dir),
+        )
+        for i in indices:
+            db_input_timestamp, db_output_timestamp = existing.get(
+                keys[i][1], (None, None)
+            )
+            if (
+                db_output_timestamp is not None
+                and db_input_timestamp >= input_timestamps[i]
+            ):
+                current[i] = db_output_timestamp
+
+    stats.received += len(bodies)
+    stats.superseded += len(bodies) - len(groups)
+    stats.already_current += sum(len(groups[i]) for i in current)
+    stats.ran += len(groups) - len(current)
+    return groups, current
+
+
+def _finish_messages(
+    outcomes: List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]],
+    titan_config: TitanConfig,
+    channel,
+) -> None:
+    """Write and notify for (body, result, failure_status) from _run_callback."""
+    notify_titan_many(_write_outcomes(outcomes, titan_config), titan_config, channel)
+
+
+def _write_outcomes(
+    outcomes: List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]],
+    titan_config: TitanConfig,
+) -> List[Tuple[str, int, str]]:
+    """Write (body, result, failure_status) from _run_callback.
+
+    Each model's rows are written with one bulk write.  If a bulk write fails, that
+    model's rows are written one at a time instead, so that one bad row doesn't keep
+    the rest of the batch from being written and notified.
+
+    Returns:
+        The (input_body, output_timestamp, status) notification for each outcome.
+    """
+    bodies = [body for body, _, _ in outcomes]
+    notifications: List[Optional[Tuple[str, int, str]]] = [None] * len(bodies)
+
+    # model_name -> [(index into bodies, (game_hash, input_timestamp, result))]
+    writes: Dict[str, List[Tuple[int, Tuple[int, str, Dict[str, Any]]]]] = (
+        collections.defaultdict(list)
+    )
+    for i, (body, result, failure_status) in enumerate(outcomes):
+        if failure_status is not None:
+            notifications[i] = (body, 0, failure_status)
+            continue
+        (_, model_name, input_timestamp, away, home, date, _,) = body.split()
+        this_game_hash = hash.game_hash(away, home, int(date))
+        writes[model_name].append((i, (this_game_hash, input_timestamp, result)))
+
+    db_name = database_resolver(titan_config.sport, titan_config.env)
+    secrets = shared_logic.get_secrets(titan_config.secrets_dir)
+    for model_name, indexed_rows in writes.items():
+        try:
+            output_timestamps, _ = pull_data.update_feature_many(
+                db_name, model_name, [row for _, row in indexed_rows], secrets
+            )
+        except Exception as err:
+            logging.error(traceback.format_exception(err))
+            output_timestamps = list()
+            for i, (this_game_hash, input_timestamp, result) in indexed_rows:
+                try:
+                    output_timestamps.append(
+                        pull_data.update_feature(
+                            db_name,
+                            model_name,
+                            this_game_hash,
+                            input_timestamp,
+                            result,
+                            secrets,
+                        )
+                    )
+                except Exception as row_err:
+                    full_msg = (
+                        f"M_ERR_TAG::{model_name}:{type(row_err).__name__} - "
+                        f"{bodies[i]} - {str(row_err)}"
+                    )
+                    logging.error(full_msg)
+                    output_timestamps.append(row_err)
+
+        for (i, _), output_timestamp in zip(indexed_rows, output_timestamps):
+            if isinstance(output_timestamp, Exception):
+                notifications[i] = (bodies[i], 0, "critical")
+            elif output_timestamp is None:
+                full_msg = f"M_ERR_TAG::{model_name}:TYPE_2_TS_ERROR - {bodies[i]}"
+                logging.error(full_msg)
+                notifications[i] = (bodies[i], 0, "failure")
+            else:
+                notifications[i] = (bodies[i], output_timestamp, "success")
+
+    return notifications
+
+
+class MessageBatcher(object):
+    """Collects messages for process_messages.
+
+    A batch is processed once it has batch_size messages, or batch_wait_ms after its
+    first message arrived, whichever comes first.  The timer runs on the pika
+    connection, so everything happens on the consumer thread.
+
+    Each message may come with a delivery handle, which is passed in order to
+    on_processed once the batch is written and notified.
+    """
+
+    def __init__(
+        self,
+        callback: MessageCallback,
+        titan_config: TitanConfig,
+        on_processed: Optional[Callable[[List[Any]], None]] = None,
+    ):
+        self.callback = callback
+        self.titan_config = titan_config
+        self.on_processed = on_processed
+        self.stats = CoalesceStats()
+        self.bodies: List[str] = list()
+        self.handles: List[Any] = list()
+        self.timer = None
+
+    def add(self, body: str, connection, channel, handle: Any = None) -> None:
+        self.bodies.append(body)
+        self.handles.append(handle)
+        if len(self.bodies) >= self.titan_config.batch_size:
+            self.flush(connection, channel)
+        elif self.timer is None:
+            self.timer = connection.call_later(
+                self.titan_config.batch_wait_ms / 1000,
+                lambda: self._on_timer(connection, channel),
+            )
+
+    def _on_timer(self, connection, channel) -> None:
+        self.timer = None
+        self.flush(connection, channel)
+
+    def flush(self, connection, channel) -> None:
+        if self.timer is not None:
+            connection.remove_timeout(self.timer)
+            self.timer = None
+        bodies, self.bodies = self.bodies, list()
+        handles, self.handles = self.handles, list()
+        if bodies:
+            process_messages(
+                bodies, self.callback, self.titan_config, channel, self.stats
+            )
+            if self.titan_config.coalesce:
+                logging.info(
+                    f"Coalescing saved {self.stats.saved()} of "
+                    f"{self.stats.received} messages"
+                )
+            if self.on_processed is not None:
+                self.on_processed(handles)
+
+    def reset_timer(self) -> None:
+        """Call when the connection is rebuilt, because the old timer is gone."""
+        self.timer = None
+
+
 class RabbitChannel(object):
     def __init__(self, callback: MessageCallback, titan_config: TitanConfig):
         warnings.warn("Please migrate to titan-common")
         # SSL Context for TLS configuration of Amazon
+        # Executors time callbacks themselves, so they get the unwrapped callback.
+        self.timer = CallbackTimer()
+        timed_callback = self.timer.wrap(callback)
+        self.batcher = None
+        if titan_config.batch_size > 1 or titan_config.coalesce:
+            self.batcher = MessageBatcher(
+                timed_callback, titan_config, on_processed=self.settle
+            )
+
+        self.executor = concurrency.build_executor(
+            titan_config.executor, titan_config.max_workers
+        )
+        self.in_flight = concurrency.OrderedFutures(titan_config.max_in_flight)
+
+        self.acker = None
+        self.prefetch = flow_control.AdaptivePrefetch(
+            PREFETCH_COUNT,
+            parallelism=titan_config.max_workers if self.executor is not None else 1,
+        )
+
         def wrapped_callback(ch, method, properties, body):
             logging.info(f"Found {body}")
-            process_message(body.decode(), callback, titan_config, self.channel)
+            # A binary message may hold many jobs.  Messages are settled in order, so
+            #  settling with the last job means all of them are done.
+            bodies = messages.decode_bodies(body)
+            handle = None
+            if self.acker is not None:
+                # Ack through this channel's acker, even if the channel is rebuilt.
+                self.acker.deliver()
+                handle = (self.acker, method.delivery_tag, len(bodies))
+            if not bodies:
+                self.settle([handle])
+                return
+            job_handles = [None] * (len(bodies) - 1) + [handle]
+            if self.executor is not None:
+                for job_body, job_handle in zip(bodies, job_handles):
+                    self.submit(job_body, callback, job_handle)
+                return
+            if self.batcher is not None:
+                for job_body, job_handle in zip(bodies, job_handles):
+                    self.batcher.add(
+                        job_body, self.connection, self.channel, job_handle
+                    )
+                return
+            if len(bodies) > 1:
+                process_messages(bodies, timed_callback, titan_config, self.channel)
+            else:
+                process_message(bodies[0], timed_callback, titan_config, self.channel)
+            self.settle([handle])
 
         self.callback = wrapped_callback
 
@@ -172,8 +613,17 @@ class RabbitChannel(object):
         self.build_connection()
 
     def build_connection(self):
+        if self.batcher is not None:
+            self.batcher.reset_timer()
         self.connection = pika.BlockingConnection(self.parameters)
         self.channel = self.connection.channel()
+        if self.titan_config.manual_ack:
+            self.acker = flow_control.AckBatcher(
+                self.channel, batch_size=self.prefetch.ack_batch_size()
+            )
+            self.connection.call_later(
+                flow_control.ACK_MAX_DELAY_SEC, self._flush_acks
+            )
         self.channel.queue_declare(
             queue=routing_key_resolver(
                 self.titan_config.inbound_channel,
@@ -222,11 +672,97 @@ class RabbitChannel(object):
             )
         )
 
+    @property
+    def unacked(self) -> int:
+        """Messages delivered on the current channel and not yet acked."""
+        if self.acker is None:
+            return 0
+        return self.acker.unacked
+
+    def settle(self, handles: List[Any]) -> None:
+        """Ack processed messages, in delivery order, and adapt prefetch.
+
+        Prefetch adapts to the time spent in callbacks since the last settle, per job,
+        times the number of jobs in each message.
+        """
+        job_sec = self.timer.take_mean()
+        for handle in handles:
+            if handle is None:
+                continue
+            acker, delivery_tag, num_jobs = handle
+            acker.ack(delivery_tag)
+            if job_sec is None:
+                continue
+            new_prefetch = self.prefetch.observe(job_sec * max(num_jobs, 1))
+            if new_prefetch is not None and acker is self.acker:
+                logging.info(f"Setting prefetch to {new_prefetch}")
+                acker.batch_size = self.prefetch.ack_batch_size()
+                self.channel.basic_qos(prefetch_count=new_prefetch, global_qos=True)
+
+    def _flush_acks(self) -> None:
+        """Runs on a timer, so acks go out even if messages stop arriving."""
+        if self.acker is None or not self.channel.is_open:
+            return
+        self.acker.flush()
+        self.connection.call_later(flow_control.ACK_MAX_DELAY_SEC, self._flush_acks)
+
+    def submit(self, body: str, callback: MessageCallback, handle: Any = None) -> None:
+        """Run the callback on the executor.
+
+        Writes, notifications, and acks happen back on the pika connection thread, in
+        the order messages arrived.  If max_in_flight messages are outstanding, this
+        blocks until the oldest one finishes.
+        """
+        if self.in_flight.full():
+            done = [self.in_flight.pop_head()]
+            done.extend(self.in_flight.pop_done())
+            self._finish_done(done)
+
+        future = self.executor.submit(_timed_run_callback, body, callback)
+        self.in_flight.add((body, handle), future)
+        # Runs on an executor thread, so hand back to the connection's thread.
+        future.add_done_callback(
+            lambda _: self.connection.add_callback_threadsafe(self.drain)
+        )
+
+    def _finish_done(self, done: List[Tuple[Tuple[str, Any], Any]]) -> None:
+        outcomes = list()
+        for (body, _), future in done:
+            (result, failure_status), sec = future.result()
+            self.timer.add(sec)
+            outcomes.append((body, result, failure_status))
+        _finish_messages(outcomes, self.titan_config, self.channel)
+        self.settle([handle for (_, handle), _ in done])
+
+    def drain(self) -> None:
+        """Write and notify for every finished message at the head of the line."""
+        done = self.in_flight.pop_done()
+        if done:
+            self._finish_done(done)
+
     @retrying.retry(wait_fixed=BIGGER_WAIT_SEC * 1000)
     def rebuild_connection(self):
         self.build_connection()
 
 
+def _start_consuming(rc: RabbitChannel, titan_config: TitanConfig) -> None:
+    if titan_config.manual_ack:
+        rc.channel.basic_qos(prefetch_count=rc.prefetch.prefetch, global_qos=True)
+    else:
+        rc.channel.basic_qos(prefetch_count=PREFETCH_COUNT)
+    rc.channel.basic_consume(
+        queue=routing_key_resolver(
+            titan_config.inbound_channel,
+            titan_config.sport,
+            titan_config.env,
+            titan_config.suffixes,
+        ),
+        on_message_callback=rc.callback,
+        auto_ack=not titan_config.manual_ack,
+    )
+    rc.channel.start_consuming()
+
+
 # TODO: Is this the right division of code?
 def main(callback: MessageCallback, titan_config: TitanConfig) -> None:
     warnings.warn("Please migrate to titan-common")
@@ -235,18 +771,7 @@ def main(callback: MessageCallback, titan_config: TitanConfig) -> None:
     while True:
         if "prod" == titan_config.env:
             try:
-                rc.channel.basic_qos(prefetch_count=PREFETCH_COUNT)
-                rc.channel.basic_consume(
-                    queue=routing_key_resolver(
-                        titan_config.inbound_channel,
-                        titan_config.sport,
-                        titan_config.env,
-                        titan_config.suffixes,
-                    ),
-                    on_message_callback=rc.callback,
-                    auto_ack=True,
-                )
-                rc.channel.start_consuming()
+                _start_consuming(rc, titan_config)
             except:
                 logging.error(traceback.format_exc())
                 time.sleep(ROLLOVER_WAIT_SEC)
@@ -255,15 +780,4 @@ def main(callback: MessageCallback, titan_config: TitanConfig) -> None:
                 # Then try again.
         else:
             # Don't retry
-            rc.channel.basic_qos(prefetch_count=PREFETCH_COUNT)
-            rc.channel.basic_consume(
-                queue=routing_key_resolver(
-                    titan_config.inbound_channel,
-                    titan_config.sport,
-                    titan_config.env,
-                    titan_config.suffixes,
-                ),
-                on_message_callback=rc.callback,
-                auto_ack=True,
-            )
-            rc.channel.start_consuming()
+            _start_consuming(rc, titan_config)
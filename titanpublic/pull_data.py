@@ -1,17 +1,93 @@
 import collections
+import concurrent.futures
 import json
 import logging
 import traceback
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import attr
-import MySQLdb
+import MySQLdb.cursors
+import numpy as np
 import pandas as pd
 
+from . import connection_pool
 from . import hash
+from . import payloads
 from . import shared_types
 
 
+UPDATE_CHUNK_SIZE = 500  # Rows per multi-row REPLACE / IN (...) query
+SPLIT_QUERY_MIN_FEATURES = 10  # Use one query per feature from this many features
+SPLIT_QUERY_WORKERS = 4  # Feature queries to run at once with the split strategy
+PULL_ITER_CHUNK_ROWS = 50000  # Default rows per chunk for pull_data_iter
+MULTI_RANGE_WORKERS = 4  # Ranges to pull at once in pull_data_multi_range
+
+
+def _sql_value_and_payload(payload: Dict[str, Any]) -> Tuple[Any, str]:
+    """Format a payload's `value` as a SQL literal, and the payload as json."""
+    value = "NULL"
+    if "value" in payload:
+        value = payload["value"]
+        if isinstance(value, str):
+            value = "'" + value + "'"
+    return value, json.dumps(payload)
+
+
+def _max_input_timestamp(input_timestamp: str) -> str:
+    """input_timestamp may be multiple timestamps separated with a comma."""
+    if input_timestamp.find(",") != -1:
+        input_timestamp = str(max([int(x) for x in input_timestamp.split(",")]))
+    return input_timestamp
+
+
+def _chunks(items: List[Any], size: int = UPDATE_CHUNK_SIZE) -> Iterator[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _existing_timestamps(
+    cur, feature: str, game_hashes: List[int]
+) -> Dict[int, Tuple[int, Optional[int]]]:
+    """game_hash -> (input_timestamp, output_timestamp) for rows already written."""
+    existing = dict()
+    for chunk in _chunks(game_hashes):
+        in_clause = ", ".join(str(game_hash) for game_hash in chunk)
+        cur.execute(
+            f"""
+            SELECT game_hash, input_timestamp, output_timestamp FROM {feature}
+            WHERE game_hash IN ({in_clause});
+        """
+        )
+        for game_hash, input_timestamp, output_timestamp in cur.fetchall():
+            if input_timestamp is not None:
+                existing[int(game_hash)] = (
+                    int(input_timestamp),
+                    None if output_timestamp is None else int(output_timestamp),
+                )
+    return existing
+
+
+def feature_timestamps(
+    db_name: str, feature: str, game_hashes: List[int], secrets: Dict[str, Any],
+) -> Dict[int, Tuple[int, Optional[int]]]:
+    """Look up the timestamps already written for a feature, for many games at once.
+
+    Args:
+        db_name: The database to look in, usually the name of the sport.
+        feature: The feature to look up.
+        game_hashes: The games to look up.
+        secrets: Contains AWS login info.
+
+    Returns:
+        game_hash -> (input_timestamp, output_timestamp), for the games that have
+        been written.
+    """
+    if not game_hashes:
+        return dict()
+    with connection_pool.connection(db_name, secrets) as con:
+        return _existing_timestamps(con.cursor(), feature, list(game_hashes))
+
+
 # TODO: Return success / failure
 def update_feature(
     db_name: str,
@@ -23,7 +99,8 @@ def update_feature(
 ) -> int:
     """Update a feature in Titan.
 
-    Looks up DB connection details from `secrets.yaml`.  Looks in the db_name database.
+    Looks up DB connection details from `secrets.yaml`.  Looks in the db_name database,
+    through the process-wide connection pool.
     It then updates the game with the new payload / input_timestamp.
 
     Args:
@@ -40,25 +117,10 @@ def update_feature(
         output_timestamp written with new record
     """
 
-    host = secrets["aws_host"]
-    port = 3306
-    dbname = db_name
-    user = secrets["aws_username"]
-    password = secrets["aws_password"]
+    value, payload = _sql_value_and_payload(payload)
+    input_timestamp = _max_input_timestamp(input_timestamp)
 
-    value = "NULL"
-    if "value" in payload:
-        value = payload["value"]
-        if isinstance(value, str):
-            value = "'" + value + "'"
-    payload = json.dumps(payload)
-
-    if input_timestamp.find(",") != -1:
-        input_timestamp = str(max([int(x) for x in input_timestamp.split(",")]))
-
-    with MySQLdb.connect(
-        host=host, port=port, user=user, passwd=password, db=dbname
-    ) as con:
+    with connection_pool.connection(db_name, secrets) as con:
         cur = con.cursor()
         cur.execute(
             f"""
@@ -93,6 +155,104 @@ def update_feature(
     return int(new_timestamp)
 
 
+def update_feature_many(
+    db_name: str,
+    feature: str,
+    rows: List[Tuple[int, str, Dict[str, Any]]],
+    secrets: Dict[str, Any],
+) -> Tuple[List[Optional[int]], List[int]]:
+    """Update a feature in Titan for many games at once.
+
+    Same as `update_feature`, but the existing input_timestamps are looked up with
+    `IN (...)` queries and the accepted rows are written with one multi-row REPLACE
+    per chunk, all on a single connection and transaction.
+
+    Like `update_feature`, a row is skipped if the DB already holds a newer
+    input_timestamp for that game.  If the same game appears more than once in rows,
+    only the row with the newest input_timestamp (the last of any ties) is written,
+    and the other rows for that game share its outcome.
+
+    Args:
+        db_name: The database to look in, usually the name of the sport.
+        feature: The feature we want to update
+        rows: (game_hash, input_timestamp, payload) for each game, as passed to
+            `update_feature`.
+        secrets: Contains AWS login info.
+
+    Returns:
+        output_timestamps: The output_timestamp written for each row, or None if the
+            row was skipped.
+        skipped: The indices of the rows that were skipped.
+    """
+    if not rows:
+        return list(), list()
+
+    formatted = list()
+    for game_hash, input_timestamp, payload in rows:
+        value, payload = _sql_value_and_payload(payload)
+        input_timestamp = _max_input_timestamp(input_timestamp)
+        if not game_hash:
+            raise Exception("Invalid game_hash on titan write")
+        if value is None:
+            raise Exception("Invalid value on titan write")
+        if payload is None:
+            raise Exception("Invalid payload on titan write")
+        if input_timestamp is None:
+            raise Exception("Invalid input_ts on titan write")
+        formatted.append((game_hash, value, payload, input_timestamp))
+
+    # Within the batch, newest input_timestamp wins per game.
+    winner: Dict[int, int] = dict()
+    for i, (game_hash, _, _, input_timestamp) in enumerate(formatted):
+        if game_hash not in winner or int(input_timestamp) >= int(
+            formatted[winner[game_hash]][3]
+        ):
+            winner[game_hash] = i
+
+    output_timestamps: List[Optional[int]] = [None] * len(rows)
+    with connection_pool.connection(db_name, secrets) as con:
+        cur = con.cursor()
+
+        existing = _existing_timestamps(cur, feature, list(winner.keys()))
+
+        accepted = list()
+        for game_hash, i in winner.items():
+            input_timestamp = int(formatted[i][3])
+            if game_hash in existing and existing[game_hash][0] > input_timestamp:
+                # Handle some weird race condition by failing here
+                continue
+            accepted.append(i)
+
+        if accepted:
+            cur.execute("SELECT UNIX_TIMESTAMP(NOW());")
+            new_timestamp = cur.fetchone()[0]
+
+            for chunk in _chunks(sorted(accepted)):
+                values_clause = ", ".join(
+                    f"({game_hash}, {value}, '{payload}', {input_timestamp}, {new_timestamp})"
+                    for game_hash, value, payload, input_timestamp in (
+                        formatted[i] for i in chunk
+                    )
+                )
+                cur.execute(
+                    f"""
+                    REPLACE INTO {feature} (game_hash, value, payload, input_timestamp, output_timestamp)
+                    VALUES {values_clause};
+                """
+                )
+            con.commit()
+
+            for i in accepted:
+                output_timestamps[i] = int(new_timestamp)
+
+    # Rows that lost to a newer row for the same game get the winner's outcome.
+    for i, (game_hash, _, _, _) in enumerate(formatted):
+        output_timestamps[i] = output_timestamps[winner[game_hash]]
+
+    skipped = [i for i, ts in enumerate(output_timestamps) if ts is None]
+    return output_timestamps, skipped
+
+
 # Cache on call side if you want a cache.
 # @functools.lru_cache()
 def pull_single_game(
@@ -103,10 +263,12 @@ def pull_single_game(
     date: shared_types.Date,
     secrets: Dict[str, Any],
     pull_payload: bool = False,
+    payload_keys: Optional[Tuple[str, ...]] = None,
 ) -> Tuple[Dict[str, Any], int]:
     """Pull a single game from Titan's DB.
 
-    Looks up DB connection details from `secrets.yaml`.  Looks in the db_name database.
+    Looks up DB connection details from `secrets.yaml`.  Looks in the db_name database,
+    through the process-wide connection pool.
     It pulls base data (except winner), and any features passed.
 
     Args:
@@ -120,23 +282,18 @@ def pull_single_game(
         pull_payload: If true, pulls entire payload for a feature, a json with
             potentially auxillary info.  Otherwise returns a single value representing
             the feature.
+        payload_keys: If set, extracts these keys from each feature's payload, as
+            {feature}_{key} entries, like pull_data.
 
     Returns:
         The variables for the game in a dict.
         input_timestamp: The input_timestamp
     """
+    payload_keys = payloads.check_keys(payload_keys)
     target_field = "payload" if pull_payload else "value"
     game_hash = hash.game_hash(away, home, date)
 
-    host = secrets["aws_host"]
-    port = 3306
-    dbname = db_name
-    user = secrets["aws_username"]
-    password = secrets["aws_password"]
-
-    with MySQLdb.connect(
-        host=host, port=port, user=user, passwd=password, db=dbname
-    ) as con:
+    with connection_pool.connection(db_name, secrets) as con:
         cur = con.cursor()
         cur.execute(
             f"""
@@ -158,54 +315,219 @@ def pull_single_game(
                 cur = con.cursor()
                 cur.execute(
                     f"""
-                    SELECT {target_field}, output_timestamp
+                    SELECT {_feature_fields(feature, target_field, payload_keys)},
+                        output_timestamp
                     FROM {feature}
                     WHERE game_hash = {game_hash};
                     """
                 )
-                value, output_timestamp = cur.fetchone()
+                *values, output_timestamp = cur.fetchone()
             except:
                 logging.debug(traceback.format_exc())
-                value, output_timestamp = None, 0
-            feature_values[feature] = value
+                values, output_timestamp = [None] * len(payload_keys or [0]), 0
+            feature_values.update(_feature_values(feature, values, payload_keys))
             timestamp = max(timestamp, output_timestamp)
 
     return feature_values, timestamp
 
 
-# @functools.lru_cache()
-def pull_data(
+def pull_games(
     db_name: str,
     features: Tuple[str, ...],
-    min_date: int,
-    max_date: int,
+    games: List[Tuple[shared_types.TeamName, shared_types.TeamName, shared_types.Date]],
     secrets: Dict[str, Any],
     pull_payload: bool = False,
-) -> Tuple[pd.DataFrame, int]:
-    """Pull data from Titan's DB.
+    payload_keys: Optional[Tuple[str, ...]] = None,
+) -> Dict[int, Tuple[Dict[str, Any], int]]:
+    """Pull many games from Titan's DB, like pull_single_game on each.
 
-    Looks up DB connection details from `secrets.yaml`.  Looks in the db_name database.
-    It pulls base data, and any features passed.  It only pulls games between the given
-    dates.
+    Instead of a query per game and feature, this pulls the games and then each
+    feature with chunked `IN (...)` queries on one connection.
 
     Args:
         db_name: The database to look in, usually the name of the sport.
         features: The non-base features, we want to pull.  These are the table names
             in the database.
-        min_date: The minimum date to pull, inclusive.
-        max_date: The maximum date to pull, exclusive.
+        games: (away, home, date) for each game we want to pull.
         secrets: Contains AWS login info.
         pull_payload: If true, pulls entire payload for a feature, a json with
             potentially auxillary info.  Otherwise returns a single value representing
             the feature.
+        payload_keys: If set, extracts these keys from each feature's payload, as
+            {feature}_{key} entries, like pull_data.
 
     Returns:
-        df: The results in a dataframe.
-        max_timestamp: The maximum timestamp over all consumed data.  Needed for titan.
+        For each game_hash found, what pull_single_game would return: The variables
+            for the game in a dict, and the timestamp.  A feature missing for a game
+            gets value None and doesn't move the timestamp, as in pull_single_game.
+            Games that aren't in the DB are left out.
     """
-    max_timestamp = 0
+    payload_keys = payloads.check_keys(payload_keys)
     target_field = "payload" if pull_payload else "value"
+    game_hashes = list(
+        dict.fromkeys(hash.game_hash(away, home, date) for away, home, date in games)
+    )
+
+    result: Dict[int, Tuple[Dict[str, Any], int]] = dict()
+    with connection_pool.connection(db_name, secrets) as con:
+        cur = con.cursor()
+        for chunk in _chunks(game_hashes):
+            in_clause = ", ".join(str(game_hash) for game_hash in chunk)
+            cur.execute(
+                f"""
+                SELECT away, home, date, neutral, winner, game_hash, timestamp
+                FROM {db_name}.games
+                WHERE game_hash IN ({in_clause});
+                """
+            )
+            for away, home, date, neutral, _, game_hash, timestamp in cur.fetchall():
+                feature_values = dict()
+                feature_values["away"] = away
+                feature_values["home"] = home
+                feature_values["date"] = date
+                feature_values["neutral"] = neutral
+                feature_values["game_hash"] = game_hash
+                result[int(game_hash)] = (feature_values, timestamp)
+
+        if len(result) < len(game_hashes):
+            logging.debug(f"{len(game_hashes) - len(result)} games not found")
+
+        found = list(result.keys())
+        for feature in features:
+            feature_rows = dict()
+            try:
+                cur = con.cursor()
+                for chunk in _chunks(found):
+                    in_clause = ", ".join(str(game_hash) for game_hash in chunk)
+                    cur.execute(
+                        f"""
+                        SELECT game_hash,
+                            {_feature_fields(feature, target_field, payload_keys)},
+                            output_timestamp
+                        FROM {feature}
+                        WHERE game_hash IN ({in_clause});
+                        """
+                    )
+                    for game_hash, *values, output_timestamp in cur.fetchall():
+                        feature_rows[int(game_hash)] = (values, output_timestamp)
+            except:
+                logging.debug(traceback.format_exc())
+                feature_rows = dict()
+
+            missing = ([None] * len(payload_keys or [0]), 0)
+            for game_hash, (feature_values, timestamp) in result.items():
+                values, output_timestamp = feature_rows.get(game_hash, missing)
+                feature_values.update(_feature_values(feature, values, payload_keys))
+                result[game_hash] = (feature_values, max(timestamp, output_timestamp))
+
+    return result
+
+
+GAMES_COLUMNS = ["away", "home", "date", "neutral", "winner", "game_hash", "timestamp"]
 
+
+def _games_query(db_name: str, where_clause: str) -> str:
+    """Base data (GAMES_COLUMNS) for the games matching where_clause."""
+    return f"""
+        SELECT away, home, date, neutral, winner, game_hash, timestamp
+        FROM {db_name}.games AS games
+        WHERE {where_clause};
+        """
+
+
+def _payload_key_columns(feature: str, payload_keys: Tuple[str, ...]) -> List[str]:
+    return [f"{feature}_{key}" for key in payload_keys]
+
+
+def _feature_values(
+    feature: str, values: List[Any], payload_keys: Optional[Tuple[str, ...]]
+) -> Dict[str, Any]:
+    """A feature's entries for a game dict, from the values _feature_fields selects."""
+    if not payload_keys:
+        return {feature: values[0]}
+    return dict(
+        zip(_payload_key_columns(feature, payload_keys), payloads.decode_many(values))
+    )
+
+
+def _decode_payload_keys(
+    df: pd.DataFrame, features: Tuple[str, ...], payload_keys: Optional[Tuple[str, ...]]
+) -> None:
+    if payload_keys:
+        payloads.decode_json_columns(
+            df,
+            [c for f in features for c in _payload_key_columns(f, payload_keys)],
+        )
+
+
+def _feature_fields(
+    feature: str, target_field: str, payload_keys: Optional[Tuple[str, ...]]
+) -> str:
+    """Select expressions for a feature's value columns.
+
+    Either {feature} from target_field, or with payload_keys, a {feature}_{key} json
+    scalar extracted from the payload for each key.  Keys must have passed
+    payloads.check_keys, since they go into the query as is.
+    """
+    if not payload_keys:
+        return f"{feature}.{target_field} AS {feature}"
+    return ", ".join(
+        f"JSON_EXTRACT({feature}.payload, '$.\"{key}\"') AS {feature}_{key}"
+        for key in payload_keys
+    )
+
+
+def _feature_query(
+    db_name: str,
+    feature: str,
+    target_field: str,
+    where_clause: str,
+    payload_keys: Optional[Tuple[str, ...]] = None,
+) -> str:
+    """Columns game_hash, {feature}, {feature}_ts for one feature table.
+
+    The feature table is joined to games, so where_clause may filter on either,
+    qualified as `games.` or `{feature}.`.  With payload_keys, there's a
+    {feature}_{key} column per key in place of {feature}.
+    """
+    return f"""
+        SELECT {feature}.game_hash AS game_hash,
+            {_feature_fields(feature, target_field, payload_keys)},
+            {feature}.output_timestamp AS {feature}_ts
+        FROM {db_name}.{feature} AS {feature}
+        JOIN {db_name}.games AS games
+        ON games.game_hash = {feature}.game_hash
+        WHERE {where_clause};
+        """
+
+
+def _attach_feature(df: pd.DataFrame, feature_df: pd.DataFrame, feature: str) -> None:
+    """Add feature_df's columns ({feature} and {feature}_ts) to df, on game_hash.
+
+    Works like a LEFT JOIN, but keeps df's row order and doesn't copy df.
+    """
+    feature_df = feature_df.set_index("game_hash")
+    for col in feature_df.columns:
+        df[col] = df["game_hash"].map(feature_df[col])
+
+
+def _join_query(
+    db_name: str,
+    features: Tuple[str, ...],
+    target_field: str,
+    where_clause: str,
+    payload_keys: Optional[Tuple[str, ...]] = None,
+) -> Tuple[str, List[str], List[str], List[str]]:
+    """One query for base data plus every feature, with a LEFT JOIN per feature.
+
+    With payload_keys, there's a {feature}_{key} column per key in place of {feature}.
+
+    Returns:
+        sql_query: The query.
+        column_names: All the columns the query returns.
+        keep_column_names: The columns that pull_data returns.
+        ts_columns: The timestamp columns, to compute max_timestamp from.
+    """
     column_names = [
         "away",
         "home",
@@ -229,12 +551,15 @@ def pull_data(
     for feature in features:
         feature_field_names.append(
             f"""
-            {feature}.{target_field} AS {feature},
+            {_feature_fields(feature, target_field, payload_keys)},
             {feature}.output_timestamp as {feature}_ts, 
         """
         )
-        column_names.extend([feature, f"{feature}_ts"])
-        keep_column_names.append(feature)
+        value_columns = [feature]
+        if payload_keys:
+            value_columns = _payload_key_columns(feature, payload_keys)
+        column_names.extend(value_columns + [f"{feature}_ts"])
+        keep_column_names.extend(value_columns)
         ts_columns.append(f"{feature}_ts")
     feature_field_names.append("1 AS const")  # Trailing comma
     column_names.append("const")
@@ -255,48 +580,400 @@ def pull_data(
             {feature_field_clause}
         FROM {db_name}.games AS games
         {feature_join_clause}
-        WHERE date >= {min_date} AND date < {max_date};
+        WHERE {where_clause};
         """
 
-    host = secrets["aws_host"]
-    port = 3306
-    dbname = db_name
-    user = secrets["aws_username"]
-    password = secrets["aws_password"]
-    with MySQLdb.connect(
-        host=host, port=port, user=user, passwd=password, db=dbname
-    ) as con:
-        pd_query = pd.read_sql_query(sql_query, con)
-        df = pd.DataFrame(pd_query, columns=column_names)
+    return sql_query, column_names, keep_column_names, ts_columns
+
+
+def _pull_split(
+    db_name: str,
+    features: Tuple[str, ...],
+    target_field: str,
+    min_date: int,
+    max_date: int,
+    secrets: Dict[str, Any],
+    max_workers: int = SPLIT_QUERY_WORKERS,
+    payload_keys: Optional[Tuple[str, ...]] = None,
+) -> Tuple[pd.DataFrame, List[str], List[str]]:
+    """Pull base data once, then each feature table with its own query.
+
+    Feature queries run on up to max_workers pooled connections at once, and are
+    merged into the games rows by game_hash.
+
+    Returns:
+        df: Base data, plus {feature} and {feature}_ts for each feature.
+        keep_column_names: The columns that pull_data returns.
+        ts_columns: The timestamp columns, to compute max_timestamp from.
+    """
+    with connection_pool.connection(db_name, secrets) as con:
+        df = pd.read_sql_query(
+            _games_query(db_name, f"date >= {min_date} AND date < {max_date}"), con
+        )
+
+    def pull_feature(feature: str) -> pd.DataFrame:
+        with connection_pool.connection(db_name, secrets) as con:
+            return pd.read_sql_query(
+                _feature_query(
+                    db_name,
+                    feature,
+                    target_field,
+                    f"games.date >= {min_date} AND games.date < {max_date}",
+                    payload_keys=payload_keys,
+                ),
+                con,
+            )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        feature_dfs = list(executor.map(pull_feature, features))
+
+    for feature, feature_df in zip(features, feature_dfs):
+        _attach_feature(df, feature_df, feature)
+
+    keep_column_names = [c for c in GAMES_COLUMNS if c != "timestamp"]
+    for feature in features:
+        if payload_keys:
+            keep_column_names.extend(_payload_key_columns(feature, payload_keys))
+        else:
+            keep_column_names.append(feature)
+    ts_columns = ["timestamp"] + [f"{feature}_ts" for feature in features]
+    return df, keep_column_names, ts_columns
+
+
+# @functools.lru_cache()
+def pull_data(
+    db_name: str,
+    features: Tuple[str, ...],
+    min_date: int,
+    max_date: int,
+    secrets: Dict[str, Any],
+    pull_payload: bool = False,
+    strategy: Optional[str] = None,
+    max_workers: int = SPLIT_QUERY_WORKERS,
+    payload_keys: Optional[Tuple[str, ...]] = None,
+) -> Tuple[pd.DataFrame, int]:
+    """Pull data from Titan's DB.
+
+    Looks up DB connection details from `secrets.yaml`.  Looks in the db_name database,
+    through the process-wide connection pool.
+    It pulls base data, and any features passed.  It only pulls games between the given
+    dates.
+
+    Args:
+        db_name: The database to look in, usually the name of the sport.
+        features: The non-base features, we want to pull.  These are the table names
+            in the database.
+        min_date: The minimum date to pull, inclusive.
+        max_date: The maximum date to pull, exclusive.
+        secrets: Contains AWS login info.
+        pull_payload: If true, pulls entire payload for a feature, a json with
+            potentially auxillary info.  Otherwise returns a single value representing
+            the feature.
+        strategy: "join" pulls everything in one query with a LEFT JOIN per feature.
+            "split" pulls the games, then each feature with its own query, merging in
+            pandas; this is friendlier to the planner for many features.  By default,
+            uses split for SPLIT_QUERY_MIN_FEATURES or more features.
+        max_workers: For the split strategy, how many feature queries to run at once.
+        payload_keys: If set, extracts these keys from each feature's payload in the
+            DB, with JSON_EXTRACT, instead of pulling the value or whole payload.
+            Each feature gets a typed {feature}_{key} column per key, null where the
+            key or payload is missing.  To decode whole payloads lazily instead, see
+            payloads.LazyPayloads.
+
+    Returns:
+        df: The results in a dataframe.
+        max_timestamp: The maximum timestamp over all consumed data.  Needed for titan.
+    """
+    payload_keys = payloads.check_keys(payload_keys)
+    target_field = "payload" if pull_payload else "value"
+    if strategy is None:
+        strategy = "split" if len(features) >= SPLIT_QUERY_MIN_FEATURES else "join"
+
+    if "join" == strategy:
+        sql_query, column_names, keep_column_names, ts_columns = _join_query(
+            db_name,
+            features,
+            target_field,
+            f"date >= {min_date} AND date < {max_date}",
+            payload_keys=payload_keys,
+        )
+        with connection_pool.connection(db_name, secrets) as con:
+            # The query's columns are already column_names, so no need to copy.
+            df = pd.read_sql_query(sql_query, con)
+    elif "split" == strategy:
+        df, keep_column_names, ts_columns = _pull_split(
+            db_name,
+            features,
+            target_field,
+            min_date,
+            max_date,
+            secrets,
+            max_workers=max_workers,
+            payload_keys=payload_keys,
+        )
+    else:
+        raise ValueError(f"Unknown pull_data strategy {strategy}")
 
     max_timestamp = 0
     for col in ts_columns:
         max_timestamp = max(max_timestamp, df[col].max())
 
+    _decode_payload_keys(df, features, payload_keys)
     return df[keep_column_names], max_timestamp
 
 
+def pull_data_since(
+    db_name: str,
+    features: Tuple[str, ...],
+    min_date: int,
+    max_date: int,
+    since_ts: int,
+    secrets: Dict[str, Any],
+    pull_payload: bool = False,
+    payload_keys: Optional[Tuple[str, ...]] = None,
+) -> Tuple[pd.DataFrame, int]:
+    """Same as pull_data, but only the games that changed since since_ts.
+
+    A game has changed if its timestamp, or the output_timestamp of any of the
+    features, is at least since_ts.  Pass the max_timestamp from the last pull_data or
+    pull_data_since, then apply the result with merge_delta.  We use >= so that rows
+    written in the same second as the last pull aren't missed; merge_delta handles
+    the repeats.
+
+    Args:
+        (Same as pull_data.)
+        since_ts: The max_timestamp returned by the previous pull.
+
+    Returns:
+        df: The changed games, with the same columns as pull_data.
+        max_timestamp: The maximum timestamp over the changed data, or since_ts if
+            nothing changed.
+    """
+    payload_keys = payloads.check_keys(payload_keys)
+    target_field = "payload" if pull_payload else "value"
+    changed_clauses = [f"games.timestamp >= {since_ts}"]
+    changed_clauses.extend(
+        f"{feature}.output_timestamp >= {since_ts}" for feature in features
+    )
+    sql_query, _, keep_column_names, ts_columns = _join_query(
+        db_name,
+        features,
+        target_field,
+        f"date >= {min_date} AND date < {max_date} "
+        f"AND ({' OR '.join(changed_clauses)})",
+        payload_keys=payload_keys,
+    )
+    with connection_pool.connection(db_name, secrets) as con:
+        df = pd.read_sql_query(sql_query, con)
+
+    max_timestamp = since_ts
+    for col in ts_columns:
+        if df[col].notna().any():
+            max_timestamp = max(max_timestamp, int(df[col].max()))
+
+    _decode_payload_keys(df, features, payload_keys)
+    return df[keep_column_names], max_timestamp
+
+
+def merge_delta(df: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Apply the result of pull_data_since to an earlier pull.
+
+    Rows in delta replace the rows with the same game_hash in df, and new games are
+    added.  Returns a new dataframe, with the changed and new rows at the end.
+    """
+    if delta.empty:
+        return df
+    delta = delta.drop_duplicates("game_hash", keep="last")
+    unchanged = df[~df["game_hash"].isin(delta["game_hash"])]
+    return pd.concat([unchanged, delta], ignore_index=True)
+
+
+def pull_data_iter(
+    db_name: str,
+    features: Tuple[str, ...],
+    min_date: int,
+    max_date: int,
+    secrets: Dict[str, Any],
+    pull_payload: bool = False,
+    chunk_rows: int = PULL_ITER_CHUNK_ROWS,
+    payload_keys: Optional[Tuple[str, ...]] = None,
+) -> Iterator[Tuple[pd.DataFrame, int]]:
+    """Same as pull_data, but yields the results in chunks.
+
+    Rows are streamed from the DB with a server-side cursor, so only one chunk is in
+    memory at a time.  Keep the generator moving, or close it; it holds a pooled
+    connection until it's done.
+
+    Args:
+        (Same as pull_data.)
+        chunk_rows: The most rows to yield at once.
+
+    Yields:
+        df: The next chunk of results, with the same columns as pull_data.
+        max_timestamp: The maximum timestamp over all data consumed so far.  After
+            the last chunk, this matches pull_data's max_timestamp.
+    """
+    payload_keys = payloads.check_keys(payload_keys)
+    target_field = "payload" if pull_payload else "value"
+    sql_query, column_names, keep_column_names, ts_columns = _join_query(
+        db_name,
+        features,
+        target_field,
+        f"date >= {min_date} AND date < {max_date}",
+        payload_keys=payload_keys,
+    )
+    drop_column_names = [c for c in column_names if c not in keep_column_names]
+
+    max_timestamp = 0
+    with connection_pool.connection(db_name, secrets) as con:
+        cur = con.cursor(MySQLdb.cursors.SSCursor)
+        try:
+            cur.execute(sql_query)
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                df = pd.DataFrame.from_records(rows, columns=column_names)
+                del rows
+                for col in ts_columns:
+                    max_timestamp = max(max_timestamp, df[col].max())
+                df.drop(columns=drop_column_names, inplace=True)
+                _decode_payload_keys(df, features, payload_keys)
+                yield df, max_timestamp
+        finally:
+            cur.close()
+
+
+def pull_data_multi_range_iter(
+    db_name: str,
+    features: Tuple[str, ...],
+    multi_range: shared_types.MultiRange,
+    secrets: Dict[str, Any],
+    pull_payload: bool = False,
+    chunk_rows: int = PULL_ITER_CHUNK_ROWS,
+    payload_keys: Optional[Tuple[str, ...]] = None,
+) -> Iterator[Tuple[pd.DataFrame, int]]:
+    """pull_data_iter over each range in turn, with a running max_timestamp."""
+    max_timestamp = 0
+    for st, en in multi_range.ranges:
+        for df, ts in pull_data_iter(
+            db_name,
+            features,
+            st,
+            en,
+            secrets,
+            pull_payload=pull_payload,
+            chunk_rows=chunk_rows,
+            payload_keys=payload_keys,
+        ):
+            max_timestamp = max(max_timestamp, ts)
+            yield df, max_timestamp
+
+
 def pull_data_multi_range(
     db_name: str,
     features: Tuple[str, ...],
     multi_range: shared_types.MultiRange,
     secrets: Dict[str, Any],
     pull_payload: bool = False,
+    strategy: Optional[str] = None,
+    max_workers: int = MULTI_RANGE_WORKERS,
+    payload_keys: Optional[Tuple[str, ...]] = None,
 ) -> Tuple[pd.DataFrame, int]:
-    dfs, tss = list(), list()
-    for st, en in multi_range.ranges:
-        df, ts = pull_data(
+    """Same as pull_data, but over every range in multi_range.
+
+    Args:
+        (Same as pull_data.)
+        strategy: "single_query" pulls all the ranges in one join query, OR-ing the
+            date ranges.  "parallel" calls pull_data for each range, with up to
+            max_workers at once.  By default, uses a single query, unless there are
+            enough features that pull_data would split its queries anyway.
+        max_workers: For the parallel strategy, how many ranges to pull at once.  A
+            range's split feature queries share the connection pool's POOL_MAX_SIZE
+            with the other ranges.
+
+    Returns:
+        df: The results in a dataframe, ordered by range as in multi_range.ranges.
+        max_timestamp: The maximum timestamp over all consumed data.  Needed for titan.
+    """
+    payload_keys = payloads.check_keys(payload_keys)
+    ranges = list(multi_range.ranges)
+    if strategy is None:
+        strategy = "single_query"
+        if len(features) >= SPLIT_QUERY_MIN_FEATURES or len(ranges) <= 1:
+            strategy = "parallel"
+
+    if "single_query" == strategy and ranges:
+        return _pull_multi_range_single_query(
+            db_name, features, ranges, secrets, pull_payload, payload_keys
+        )
+    if strategy not in ("single_query", "parallel"):
+        raise ValueError(f"Unknown pull_data_multi_range strategy {strategy}")
+
+    range_workers = max(1, min(max_workers, len(ranges)))
+    # pull_data may split its queries over threads too, so share the pool's
+    #  connections between ranges, rather than queueing range_workers times over.
+    feature_workers = max(
+        1, min(SPLIT_QUERY_WORKERS, connection_pool.POOL_MAX_SIZE // range_workers)
+    )
+
+    def pull_range(date_range: Tuple[int, int]) -> Tuple[pd.DataFrame, int]:
+        st, en = date_range
+        return pull_data(
             db_name,
             features,
             st,
             en,
             secrets,
             pull_payload=pull_payload,
+            max_workers=feature_workers,
+            payload_keys=payload_keys,
         )
-        dfs.append(df)
-        tss.append(ts)
+
+    if range_workers <= 1:
+        results = [pull_range(date_range) for date_range in ranges]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=range_workers
+        ) as executor:
+            # map keeps the results in range order.
+            results = list(executor.map(pull_range, ranges))
+
+    dfs = [df for df, _ in results]
+    tss = [ts for _, ts in results]
 
     result_df = pd.concat(dfs, ignore_index=True)
     result_ts = max(tss)
 
     return result_df, result_ts
+
+
+def _pull_multi_range_single_query(
+    db_name: str,
+    features: Tuple[str, ...],
+    ranges: List[Tuple[int, int]],
+    secrets: Dict[str, Any],
+    pull_payload: bool,
+    payload_keys: Optional[Tuple[str, ...]],
+) -> Tuple[pd.DataFrame, int]:
+    target_field = "payload" if pull_payload else "value"
+    where_clause = " OR ".join(f"(date >= {st} AND date < {en})" for st, en in ranges)
+    sql_query, _, keep_column_names, ts_columns = _join_query(
+        db_name, features, target_field, where_clause, payload_keys=payload_keys
+    )
+    with connection_pool.connection(db_name, secrets) as con:
+        df = pd.read_sql_query(sql_query, con)
+
+    max_timestamp = 0
+    for col in ts_columns:
+        max_timestamp = max(max_timestamp, df[col].max())
+
+    # Group rows by range, like concatenating a pull per range would.  Ranges are
+    #  sorted and disjoint, so the range is found by the last start <= date.
+    starts = np.array([st for st, _ in ranges])
+    range_index = np.searchsorted(starts, df["date"].to_numpy(), side="right")
+    order = np.argsort(range_index, kind="stable")
+    df = df.take(order)[keep_column_names].reset_index(drop=True)
+
+    _decode_payload_keys(df, features, payload_keys)
+    return df, max_timestamp
@@ -1,10 +1,16 @@
+import collections
+import concurrent.futures
 import functools
 import logging
 import os
 import ssl
+import threading
 import time
-from typing import Any, Callable, Iterable, Optional, Set, Tuple, Union
+import traceback
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
+import attr
 import pika
 import redis
 import retrying
@@ -14,6 +20,18 @@ import titanpublic
 PREFETCH_COUNT = 100  # Minibatch size
 ROLLOVER_WAIT_SEC = 3  # How long to wait before restarting on a Rabbit timeout
 BIGGER_WAIT_SEC = 240  # How long to wait if the Rabbit node is down.
+RABBIT_INACTIVITY_SEC = 300  # Rebuild the channel if a queue is empty this long
+
+PUBLISH_CHUNK_SIZE = 1000  # Most messages per multi-value RPUSH
+REDIS_POP_BATCH = 100  # Most messages to take from Redis at once
+REDIS_BLOCK_TIMEOUT_SEC = 5  # How long to block on an empty queue before rechecking
+VISIBILITY_TIMEOUT_SEC = 600  # Reliable Redis: Requeue if not acked within this
+MAX_DELIVERY_ATTEMPTS = 5  # Reliable Redis: Dead-letter after this many failures
+REAP_INTERVAL_SEC = 30  # Reliable Redis: How often to look for expired leases
+DELIVERY_ID_LEN = 32  # Reliable Redis: Length of a hex uuid4 delivery id
+REBALANCE_SEC = 30  # Partitioned queues: How often workers reclaim shards
+HEARTBEAT_SEC = 10  # Partitioned queues: How often workers say they're alive
+WORKER_TTL_SEC = 3 * HEARTBEAT_SEC  # Partitioned queues: Drop silent workers
 
 RETRIES = 1 if "dev" == os.environ.get("TITAN_ENV", "dev") else None
 
@@ -25,12 +43,22 @@ CallbackArgument = Tuple[Optional[str], Optional[str], Optional[str], Optional[s
 ConditionSignature = Any  # Callable[[], None]
 
 
+def _timed_callback(callback: CallbackSignature, *callback_args) -> float:
+    """Run callback, and return the seconds it took.  Module level, for processes."""
+    start = time.monotonic()
+    callback(*callback_args)
+    return time.monotonic() - start
+
+
 def msg_pad(msg: str) -> CallbackArgument:
     # Dumb shit needed for historical reasons
     return (None, None, None, msg)
 
 
 class QueueChannel(object):
+    # Whether consumption_impl takes a list of routing keys, for partitioned queues.
+    partitioned_consumption = False
+
     def __init__(self):
         self.sport = os.environ.get("SPORT", "ncaam")
         self.env = os.environ.get("TITAN_ENV", "dev")
@@ -102,7 +130,7 @@ class QueueChannel(object):
         )
 
         try:
-            self.queue_clear_impl(queue_id)
+            self.queue_clear_impl(routing_key)
         except self.retry_exceptions:
             self.build_channel()
             self.queue_clear(queue_id)
@@ -132,20 +160,129 @@ class QueueChannel(object):
     def basic_publish_impl(self, routing_key: str, msg: str) -> None:
         raise NotImplementedError
 
+    def basic_publish_many(
+        self, msgs: List[str], queue_id: str, suffix: str = ""
+    ) -> None:
+        """Publish many messages to one queue, in order.
+
+        If the channel fails part way, it's rebuilt and the whole batch is published
+        again, so some messages may be delivered twice.
+        """
+        if not self.built:
+            raise AttributeError("Pls build channel first.")
+        if queue_id not in self.all_queues:
+            raise Exception(f"Please first build queue {queue_id}")
+        if not msgs:
+            return
+
+        routing_key = titanpublic.pod_helpers.routing_key_resolver(
+            queue_id,
+            self.sport,
+            self.env,
+            suffix=suffix,
+        )
+
+        try:
+            self.basic_publish_many_impl(routing_key, msgs)
+        except self.retry_exceptions:
+            self.build_channel()
+            self.basic_publish_many(msgs, queue_id, suffix)
+
+    def basic_publish_many_impl(self, routing_key: str, msgs: List[str]) -> None:
+        for msg in msgs:
+            self.basic_publish_impl(routing_key, msg)
+
     def _consume_while_condition(
         self,
         routing_key: str,
         callback: CallbackSignature,
         condition: ConditionSignature,
+        executor: Optional[concurrent.futures.Executor] = None,
+        max_in_flight: int = PREFETCH_COUNT,
     ) -> None:
         if not condition():
             return
 
-        while condition():
-            for callback_args in self.consumption_impl(routing_key):
-                callback(*callback_args)
-                if not condition():
-                    return
+        try:
+            if executor is not None:
+                self._consume_on_executor(
+                    routing_key, callback, condition, executor, max_in_flight
+                )
+                return
+
+            while condition():
+                for callback_args in self.consumption_impl(routing_key):
+                    try:
+                        callback_sec = _timed_callback(callback, *callback_args)
+                    except:
+                        self.nack_impl(routing_key, callback_args)
+                        raise
+                    self.observe_callback_impl(routing_key, callback_sec, 1)
+                    self.ack_impl(routing_key, callback_args)
+                    if not condition():
+                        return
+        finally:
+            self.consumption_stopped_impl(routing_key)
+
+    def _settle(
+        self,
+        routing_key: str,
+        callback_args: CallbackArgument,
+        future: concurrent.futures.Future,
+        parallelism: int,
+    ) -> None:
+        """Ack or nack a finished callback, raising its exception if it failed."""
+        try:
+            callback_sec = future.result()
+        except:
+            self.nack_impl(routing_key, callback_args)
+            raise
+        self.observe_callback_impl(routing_key, callback_sec, parallelism)
+        self.ack_impl(routing_key, callback_args)
+
+    def _consume_on_executor(
+        self,
+        routing_key: str,
+        callback: CallbackSignature,
+        condition: ConditionSignature,
+        executor: concurrent.futures.Executor,
+        max_in_flight: int,
+    ) -> None:
+        """Run callbacks in parallel, with at most max_in_flight outstanding.
+
+        Results are collected on this thread in the order messages were consumed, so
+        a callback's exception is raised here, after all earlier messages finished.
+        """
+        in_flight = titanpublic.concurrency.OrderedFutures(max_in_flight)
+        # How many callbacks actually run at once.  Executors don't expose their
+        #  size publicly, but the standard ones keep it in _max_workers.
+        parallelism = min(
+            max_in_flight, getattr(executor, "_max_workers", max_in_flight)
+        )
+        try:
+            while condition():
+                for callback_args in self.consumption_impl(routing_key):
+                    if in_flight.full():
+                        self._settle(routing_key, *in_flight.pop_head(), parallelism)
+                    in_flight.add(
+                        callback_args,
+                        executor.submit(_timed_callback, callback, *callback_args),
+                    )
+                    for callback_args, future in in_flight.pop_done():
+                        self._settle(routing_key, callback_args, future, parallelism)
+                    if not condition():
+                        break
+        except:
+            # Let outstanding callbacks finish, but raise the original error.
+            while len(in_flight):
+                try:
+                    self._settle(routing_key, *in_flight.pop_head(), parallelism)
+                except Exception:
+                    logging.error(traceback.format_exc())
+            raise
+
+        while len(in_flight):
+            self._settle(routing_key, *in_flight.pop_head(), parallelism)
 
     def consume_while_condition(
         self,
@@ -153,7 +290,14 @@ class QueueChannel(object):
         callback: CallbackSignature,
         condition: ConditionSignature,
         suffix="",
+        executor: Optional[concurrent.futures.Executor] = None,
+        max_in_flight: int = PREFETCH_COUNT,
     ) -> None:
+        """Consume from the queue, calling callback on each message, while condition.
+
+        If an executor is passed (see titanpublic.concurrency.build_executor),
+        callbacks run on it, with at most max_in_flight outstanding.
+        """
         if not self.built:
             raise AttributeError("Pls build channel first.")
         if queue_id not in self.all_queues:
@@ -167,26 +311,236 @@ class QueueChannel(object):
         )
 
         try:
-            self._consume_while_condition(routing_key, callback, condition)
+            self._consume_while_condition(
+                routing_key, callback, condition, executor, max_in_flight
+            )
         except self.retry_exceptions:
             logging.error("Pika exception")
             time.sleep(ROLLOVER_WAIT_SEC)
             self.build_channel()
-            self.consume_while_condition(callback, condition)
+            self.consume_while_condition(
+                queue_id,
+                callback,
+                condition,
+                suffix=suffix,
+                executor=executor,
+                max_in_flight=max_in_flight,
+            )
+
+    def queue_declare_partitioned(self, queue_id: str, num_shards: int) -> None:
+        """Declare a queue split into num_shards shard queues."""
+        for shard in range(num_shards):
+            self.queue_declare(titanpublic.partitioning.shard_queue_id(queue_id, shard))
+
+    def basic_publish_partitioned(
+        self, msg: str, queue_id: str, game_hash: int, num_shards: int
+    ) -> None:
+        """Publish to the shard that game_hash belongs to."""
+        shard = titanpublic.partitioning.shard_for(game_hash, num_shards)
+        self.basic_publish(
+            msg, titanpublic.partitioning.shard_queue_id(queue_id, shard)
+        )
+
+    def basic_publish_many_partitioned(
+        self, msgs: List[Tuple[str, int]], queue_id: str, num_shards: int
+    ) -> None:
+        """Publish (msg, game_hash) pairs, with one batch publish per shard.
+
+        Messages for the same game keep their order.
+        """
+        by_shard: Dict[int, List[str]] = collections.defaultdict(list)
+        for msg, game_hash in msgs:
+            by_shard[titanpublic.partitioning.shard_for(game_hash, num_shards)].append(
+                msg
+            )
+        for shard, shard_msgs in by_shard.items():
+            self.basic_publish_many(
+                shard_msgs, titanpublic.partitioning.shard_queue_id(queue_id, shard)
+            )
+
+    def consume_partitioned_while_condition(
+        self,
+        queue_id: str,
+        callback: CallbackSignature,
+        condition: ConditionSignature,
+        num_shards: int,
+        worker_id: Optional[str] = None,
+        workers: Optional[List[str]] = None,
+        executor: Optional[concurrent.futures.Executor] = None,
+        max_in_flight: int = PREFETCH_COUNT,
+    ) -> None:
+        """Consume the shards of a partitioned queue claimed by this worker.
+
+        Only channels with partitioned_consumption (RedisChannel) can do this, since
+        it waits on many shard queues at once.  Any channel can declare and publish
+        to a partitioned queue.
+
+        Every REBALANCE_SEC, this looks up the live workers and reclaims shards (see
+        partitioning.claim_shards), so that each shard has one consumer and messages
+        for a game are processed in order.  While workers join or leave, two workers
+        may briefly both consume a shard.
+
+        Workers heartbeat every HEARTBEAT_SEC from a background thread, so a worker
+        stays live however long its callbacks take.
+
+        Args:
+            worker_id: Identifies this worker.  Defaults to host and pid.
+            workers: A fixed list of all workers.  If not given, workers are
+                discovered with partition_workers_impl, and this worker
+                heartbeats with partition_heartbeat_impl.
+            (Otherwise, same as consume_while_condition.)
+        """
+        if not self.partitioned_consumption:
+            raise NotImplementedError(
+                f"{type(self).__name__} can't consume partitioned queues; "
+                "use a RedisChannel"
+            )
+        if worker_id is None:
+            worker_id = titanpublic.partitioning.default_worker_id()
+        self.queue_declare_partitioned(queue_id, num_shards)
+        group_key = titanpublic.pod_helpers.routing_key_resolver(
+            queue_id, self.sport, self.env
+        )
+
+        stop_heartbeat = threading.Event()
+        if workers is None:
+            self.partition_heartbeat_impl(group_key, worker_id)
+            heartbeat = threading.Thread(
+                target=self._heartbeat_until,
+                args=(stop_heartbeat, group_key, worker_id),
+                daemon=True,
+            )
+            heartbeat.start()
+
+        try:
+            while condition():
+                live_workers = workers
+                if live_workers is None:
+                    live_workers = self.partition_workers_impl(group_key)
+                shards = titanpublic.partitioning.claim_shards(
+                    worker_id, live_workers, num_shards
+                )
+                logging.info(f"Worker {worker_id} claimed shards {shards}")
+                rebalance_at = time.monotonic() + REBALANCE_SEC
+                if not shards:
+                    time.sleep(REBALANCE_SEC)
+                    continue
+
+                routing_keys = [
+                    titanpublic.pod_helpers.routing_key_resolver(
+                        titanpublic.partitioning.shard_queue_id(queue_id, shard),
+                        self.sport,
+                        self.env,
+                    )
+                    for shard in shards
+                ]
+                self._consume_while_condition(
+                    routing_keys,
+                    callback,
+                    lambda: condition() and time.monotonic() < rebalance_at,
+                    executor,
+                    max_in_flight,
+                )
+        finally:
+            if workers is None:
+                stop_heartbeat.set()
+                heartbeat.join()
+                self.partition_leave_impl(group_key, worker_id)
+
+    def _heartbeat_until(
+        self, stop: threading.Event, group_key: str, worker_id: str
+    ) -> None:
+        while not stop.wait(HEARTBEAT_SEC):
+            try:
+                self.partition_heartbeat_impl(group_key, worker_id)
+            except Exception:
+                # Keep trying; we only drop out if we miss WORKER_TTL_SEC of these.
+                logging.error(traceback.format_exc())
+
+    def partition_heartbeat_impl(self, group_key: str, worker_id: str) -> None:
+        """Mark worker_id live in group_key.  Called from a background thread."""
+        raise NotImplementedError
+
+    def partition_workers_impl(self, group_key: str) -> List[str]:
+        """All live workers for group_key."""
+        raise NotImplementedError
+
+    def partition_leave_impl(self, group_key: str, worker_id: str) -> None:
+        pass
 
     def consume_to_death(
-        self, queue_id: str, callback: CallbackSignature, suffix: str = ""
+        self,
+        queue_id: str,
+        callback: CallbackSignature,
+        suffix: str = "",
+        executor: Optional[concurrent.futures.Executor] = None,
+        max_in_flight: int = PREFETCH_COUNT,
     ) -> None:
-        self.consume_while_condition(queue_id, callback, lambda: True, suffix=suffix)
+        self.consume_while_condition(
+            queue_id,
+            callback,
+            lambda: True,
+            suffix=suffix,
+            executor=executor,
+            max_in_flight=max_in_flight,
+        )
 
     def consumption_impl(self, routing_key: str) -> Iterable[CallbackArgument]:
         raise NotImplementedError
 
+    def ack_impl(self, routing_key: str, callback_args: CallbackArgument) -> None:
+        """Called after a callback succeeds on a message.  Nothing by default."""
+        pass
+
+    def nack_impl(self, routing_key: str, callback_args: CallbackArgument) -> None:
+        """Called after a callback raises on a message.  Nothing by default."""
+        pass
+
+    def consumption_stopped_impl(self, routing_key: str) -> None:
+        """Called when consumption stops, even on an error.  Nothing by default."""
+        pass
+
+    def observe_callback_impl(
+        self, routing_key: str, callback_sec: float, parallelism: int
+    ) -> None:
+        """Called after a callback succeeds, with how long it ran.  Nothing by default.
+
+        callback_sec doesn't count time waiting for an executor worker.  parallelism
+        is how many callbacks run at once.
+        """
+        pass
+
+
+@attr.s
+class ConsumerStats(object):
+    consumed: int = attr.ib(default=0)  # Messages handed to callbacks
+    pops: int = attr.ib(default=0)  # Blocking pops issued
+    empty_pops: int = attr.ib(default=0)  # Blocking pops that timed out
+    idle_sec: float = attr.ib(default=0.0)  # Time spent blocked waiting on messages
+    busy_sec: float = attr.ib(default=0.0)  # All other time in consumption
+
+    def throughput(self) -> float:
+        """Messages per second, excluding idle time."""
+        if not self.busy_sec:
+            return 0.0
+        return self.consumed / self.busy_sec
+
 
 class RedisChannel(QueueChannel):
-    def __init__(self, host: str = "localhost", port: int = 6379):
+    partitioned_consumption = True
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        pop_batch: int = REDIS_POP_BATCH,
+        block_timeout_sec: int = REDIS_BLOCK_TIMEOUT_SEC,
+    ):
         super().__init__()
         self.r = redis.Redis(host=host, port=port, db=0)
+        self.pop_batch = pop_batch
+        self.block_timeout_sec = block_timeout_sec
+        self.stats = ConsumerStats()
 
     def build_channel_impl(self) -> None:
         pass  # Nothing to do for redis
@@ -200,23 +554,316 @@ class RedisChannel(QueueChannel):
     def basic_publish_impl(self, routing_key: str, msg: str) -> None:
         self.r.rpush(routing_key, msg)
 
+    def basic_publish_many_impl(self, routing_key: str, msgs: List[str]) -> None:
+        # Multi-value RPUSHes, sent in one round trip.
+        pipe = self.r.pipeline(transaction=False)
+        for i in range(0, len(msgs), PUBLISH_CHUNK_SIZE):
+            pipe.rpush(routing_key, *msgs[i : i + PUBLISH_CHUNK_SIZE])
+        pipe.execute()
+
+    def _pop_more(self, routing_key: str, count: int) -> List[bytes]:
+        try:
+            return self.r.lpop(routing_key, count) or list()
+        except redis.exceptions.ResponseError:
+            # LPOP with a count needs Redis 6.2, so fall back to a pipeline.
+            pipe = self.r.pipeline(transaction=False)
+            for _ in range(count):
+                pipe.lpop(routing_key)
+            return [msg for msg in pipe.execute() if msg is not None]
+
+    def consumption_impl(
+        self, routing_key: Union[str, List[str]]
+    ) -> Iterable[CallbackArgument]:
+        """Block for a message, then take up to pop_batch without blocking.
+
+        Yields nothing if no message comes within block_timeout_sec, so the caller
+        gets to check its condition.  If the caller stops early, the messages that
+        weren't yielded are pushed back to the front of the queue.
+
+        routing_key may be a list of keys (shards), in which case this waits on all
+        of them, and takes the batch from whichever has a message first.
+        """
+        routing_keys = [routing_key] if isinstance(routing_key, str) else routing_key
+        start = time.monotonic()
+        self.stats.pops += 1
+        popped = self.r.blpop(routing_keys, timeout=self.block_timeout_sec)
+        if popped is None:
+            self.stats.empty_pops += 1
+            self.stats.idle_sec += time.monotonic() - start
+            return
+        self.stats.idle_sec += time.monotonic() - start
+
+        busy_start = time.monotonic()
+        routing_key, msg = popped
+        if isinstance(routing_key, bytes):
+            routing_key = routing_key.decode()
+        msgs = [msg]
+        if self.pop_batch > 1:
+            msgs.extend(self._pop_more(routing_key, self.pop_batch - 1))
+
+        next_i = 0
+        try:
+            for i, msg in enumerate(msgs):
+                next_i = i + 1
+                self.stats.consumed += 1
+                yield msg_pad(msg)
+        finally:
+            if next_i < len(msgs):
+                self.r.lpush(routing_key, *reversed(msgs[next_i:]))
+            self.stats.busy_sec += time.monotonic() - busy_start
+
+    def partition_heartbeat_impl(self, group_key: str, worker_id: str) -> None:
+        # Workers heartbeat into a sorted set, scored by time.
+        self.r.zadd(f"{group_key}:workers", {worker_id: time.time()})
+
+    def partition_workers_impl(self, group_key: str) -> List[str]:
+        workers_key = f"{group_key}:workers"
+        pipe = self.r.pipeline(transaction=True)
+        pipe.zremrangebyscore(workers_key, "-inf", time.time() - WORKER_TTL_SEC)
+        pipe.zrange(workers_key, 0, -1)
+        workers = pipe.execute()[-1]
+        return [worker.decode() for worker in workers]
+
+    def partition_leave_impl(self, group_key: str, worker_id: str) -> None:
+        self.r.zrem(f"{group_key}:workers", worker_id)
+
+
+@attr.s
+class ReliableConsumerStats(ConsumerStats):
+    acked: int = attr.ib(default=0)
+    requeued: int = attr.ib(default=0)  # Nacked or timed out, and put back
+    dead_lettered: int = attr.ib(default=0)  # Failed max_attempts times
+
+
+@attr.s(frozen=True)
+class RedisDelivery(object):
+    """One delivery from a ReliableRedisChannel, passed where Rabbit passes method."""
+
+    delivery_id: bytes = attr.ib()
+    element: bytes = attr.ib()  # As stored in Redis, with the delivery id
+
+
+class ReliableRedisChannel(RedisChannel):
+    """An at-least-once Redis queue.
+
+    Messages published through this channel are prefixed with a unique delivery id,
+    so that identical messages are tracked separately.  (Messages pushed without
+    one are their own delivery id.)  Callbacks get the message without the prefix.
+
+    Consuming atomically moves a message (BLMOVE) from the queue to this consumer's
+    processing list.  A message is removed when its callback succeeds (ack), and put
+    back on the end of the queue when its callback raises (nack).  After max_attempts
+    failures, a message goes to the dead-letter list, `{routing_key}:dead`, instead.
+
+    Leases are per consumer: before each pop, a consumer extends its lease to
+    visibility_timeout_sec past the longest the pop could block.  Since the lease is
+    taken before the message moves, there's no moment when a message is in a
+    processing list without a lease.  Any consumer reaps the processing lists of
+    consumers whose leases expired (for example because they died, or a callback
+    hung), every reap_interval_sec.  Needs Redis 6.2 or later for BLMOVE.
+
+    Can't consume partitioned queues, since BLMOVE waits on a single queue.
+    """
+
+    partitioned_consumption = False
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        consumer_id: Optional[str] = None,
+        visibility_timeout_sec: int = VISIBILITY_TIMEOUT_SEC,
+        max_attempts: int = MAX_DELIVERY_ATTEMPTS,
+        block_timeout_sec: int = REDIS_BLOCK_TIMEOUT_SEC,
+        reap_interval_sec: int = REAP_INTERVAL_SEC,
+    ):
+        super().__init__(
+            host=host, port=port, pop_batch=1, block_timeout_sec=block_timeout_sec
+        )
+        if consumer_id is None:
+            consumer_id = titanpublic.partitioning.default_worker_id()
+        self.consumer_id = consumer_id
+        self.visibility_timeout_sec = visibility_timeout_sec
+        self.max_attempts = max_attempts
+        self.reap_interval_sec = reap_interval_sec
+        self.last_reap = 0.0
+        self.stats = ReliableConsumerStats()
+
+    @staticmethod
+    def processing_key(routing_key: str, consumer_id: str) -> str:
+        return f"{routing_key}:processing:{consumer_id}"
+
+    @staticmethod
+    def dead_letter_key(routing_key: str) -> str:
+        return f"{routing_key}:dead"
+
+    @staticmethod
+    def _leases_key(routing_key: str) -> str:
+        return f"{routing_key}:leases"
+
+    @staticmethod
+    def _attempts_key(routing_key: str) -> str:
+        return f"{routing_key}:attempts"
+
+    @staticmethod
+    def with_delivery_id(msg: Union[str, bytes]) -> bytes:
+        if isinstance(msg, str):
+            msg = msg.encode()
+        return uuid.uuid4().hex.encode() + b"\x00" + msg
+
+    @staticmethod
+    def split_delivery_id(element: bytes) -> Tuple[bytes, bytes]:
+        """(delivery_id, msg) for an element of the queue."""
+        delivery_id, sep, msg = element.partition(b"\x00")
+        if not sep or len(delivery_id) != DELIVERY_ID_LEN:
+            # Pushed without a delivery id
+            return element, element
+        return delivery_id, msg
+
+    def basic_publish_impl(self, routing_key: str, msg: str) -> None:
+        super().basic_publish_impl(routing_key, self.with_delivery_id(msg))
+
+    def basic_publish_many_impl(self, routing_key: str, msgs: List[str]) -> None:
+        super().basic_publish_many_impl(
+            routing_key, [self.with_delivery_id(msg) for msg in msgs]
+        )
+
+    def queue_clear_impl(self, routing_key: str) -> None:
+        self.r.delete(
+            routing_key,
+            self.processing_key(routing_key, self.consumer_id),
+            self._attempts_key(routing_key),
+        )
+        self.r.zrem(self._leases_key(routing_key), self.consumer_id)
+
     def consumption_impl(self, routing_key: str) -> Iterable[CallbackArgument]:
-        msg = self.r.lpop(routing_key)
-        while msg is None:
-            msg = self.r.lpop(routing_key)
-        yield msg_pad(msg)
+        self.r.zadd(
+            self._leases_key(routing_key),
+            {
+                self.consumer_id: time.time()
+                + self.block_timeout_sec
+                + self.visibility_timeout_sec
+            },
+        )
+        if time.monotonic() - self.last_reap > self.reap_interval_sec:
+            self.reap(routing_key)
+
+        start = time.monotonic()
+        self.stats.pops += 1
+        element = self.r.blmove(
+            routing_key,
+            self.processing_key(routing_key, self.consumer_id),
+            self.block_timeout_sec,
+            src="LEFT",
+            dest="RIGHT",
+        )
+        self.stats.idle_sec += time.monotonic() - start
+        if element is None:
+            self.stats.empty_pops += 1
+            return
+
+        self.stats.consumed += 1
+        delivery_id, msg = self.split_delivery_id(element)
+        yield (None, RedisDelivery(delivery_id, element), None, msg)
+
+    def ack_impl(self, routing_key: str, callback_args: CallbackArgument) -> None:
+        delivery = callback_args[1]
+        pipe = self.r.pipeline(transaction=True)
+        pipe.lrem(
+            self.processing_key(routing_key, self.consumer_id), 1, delivery.element
+        )
+        pipe.hdel(self._attempts_key(routing_key), delivery.delivery_id)
+        pipe.execute()
+        self.stats.acked += 1
+
+    def nack_impl(self, routing_key: str, callback_args: CallbackArgument) -> None:
+        self._retry_or_dead_letter(
+            routing_key, self.consumer_id, callback_args[1].element
+        )
+
+    def _retry_or_dead_letter(
+        self, routing_key: str, consumer_id: str, element: bytes
+    ) -> None:
+        # Only whoever removes the message from processing gets to put it back, so
+        #  a racing ack, nack, or reap can't deliver it twice.
+        removed = self.r.lrem(self.processing_key(routing_key, consumer_id), 1, element)
+        if not removed:
+            return
+
+        delivery_id, _ = self.split_delivery_id(element)
+        attempts = self.r.hincrby(self._attempts_key(routing_key), delivery_id, 1)
+        pipe = self.r.pipeline(transaction=True)
+        if attempts >= self.max_attempts:
+            logging.error(f"Dead-lettering {element} after {attempts} attempts")
+            pipe.hdel(self._attempts_key(routing_key), delivery_id)
+            pipe.rpush(self.dead_letter_key(routing_key), element)
+            self.stats.dead_lettered += 1
+        else:
+            pipe.rpush(routing_key, element)
+            self.stats.requeued += 1
+        pipe.execute()
+
+    def reap(self, routing_key: str) -> None:
+        """Requeue (or dead-letter) the messages of every consumer whose lease expired.
+
+        Reads processing lists directly, so nothing a dead consumer held is missed.
+        """
+        self.last_reap = time.monotonic()
+        leases_key = self._leases_key(routing_key)
+        expired = self.r.zrangebyscore(leases_key, "-inf", time.time())
+        for consumer_id in expired:
+            consumer_id = consumer_id.decode()
+            processing_key = self.processing_key(routing_key, consumer_id)
+            for element in self.r.lrange(processing_key, 0, -1):
+                logging.debug(f"Lease expired on {element} for {consumer_id}")
+                self._retry_or_dead_letter(routing_key, consumer_id, element)
+            self._drop_lease(leases_key, processing_key, consumer_id)
+
+    def _drop_lease(
+        self, leases_key: str, processing_key: str, consumer_id: str
+    ) -> None:
+        # Unless the consumer came back, and renewed its lease or took a message.
+        with self.r.pipeline(transaction=True) as pipe:
+            try:
+                pipe.watch(leases_key, processing_key)
+                expiry = pipe.zscore(leases_key, consumer_id)
+                if expiry is None or expiry > time.time() or pipe.llen(processing_key):
+                    return
+                pipe.multi()
+                pipe.zrem(leases_key, consumer_id)
+                pipe.execute()
+            except redis.WatchError:
+                pass
 
 
 class RabbitChannel(QueueChannel):
     def __init__(
-        self, rabbitmq_user: str, rabbitmq_password: str, rabbitmq_broker_id: str
+        self,
+        rabbitmq_user: str,
+        rabbitmq_password: str,
+        rabbitmq_broker_id: str,
+        publisher_confirms: bool = False,
+        manual_ack: bool = False,
     ):
-        super().__init__()
-        if "prod" == self.env:
-            self.retry_exceptions = (*self.retry_exceptions, pika.AMQPError)
+        """If publisher_confirms, each publish waits for the broker to confirm it.
+
+        This is safer but slower, because pika's blocking channel waits on each
+        confirm in turn.
+
+        If manual_ack, consumed messages are acked after their callback succeeds
+        (in batches, with multiple=True), and nacked back onto the queue if it
+        raises.  Prefetch then adapts to how long callbacks take.
+        """
         self.rabbitmq_user = rabbitmq_user
         self.rabbitmq_password = rabbitmq_password
         self.rabbitmq_broker_id = rabbitmq_broker_id
+        self.publisher_confirms = publisher_confirms
+        self.manual_ack = manual_ack
+        self.acker: Optional[titanpublic.flow_control.AckBatcher] = None
+        self.prefetch = titanpublic.flow_control.AdaptivePrefetch(PREFETCH_COUNT)
+        super().__init__()
+        if "prod" == self.env:
+            self.retry_exceptions = (*self.retry_exceptions, pika.AMQPError)
 
     def build_channel_impl(self) -> None:
         logging.error("Starting pika connection")
@@ -235,7 +882,10 @@ class RabbitChannel(QueueChannel):
         parameters.heartbeat = 600
 
         connection = pika.BlockingConnection(parameters)
-        return connection.channel()
+        channel = connection.channel()
+        if self.publisher_confirms:
+            channel.confirm_delivery()
+        return channel
 
     def queue_declare_impl(self, routing_key: str) -> None:
         self._channel.queue_declare(queue=routing_key)
@@ -248,12 +898,33 @@ class RabbitChannel(QueueChannel):
             properties=pika.BasicProperties(delivery_mode=1),
         )
 
+    def basic_publish_many_impl(self, routing_key: str, msgs: List[str]) -> None:
+        properties = pika.BasicProperties(delivery_mode=1)
+        for msg in msgs:
+            self._channel.basic_publish(
+                exchange="",
+                routing_key=routing_key,
+                body=msg,
+                properties=properties,
+            )
+
+    @property
+    def unacked(self) -> int:
+        """Messages delivered on the current channel and not yet acked."""
+        if self.acker is None or self.acker.channel is not self._channel:
+            return 0
+        return self.acker.unacked
+
     def consumption_impl(self, routing_key: str) -> Iterable[CallbackArgument]:
+        if self.manual_ack:
+            yield from self._manual_ack_consumption(routing_key)
+            return
+
         self._channel.basic_qos(prefetch_count=PREFETCH_COUNT)
         for method, properties, body in self._channel.consume(
             queue=routing_key,
             auto_ack=True,
-            inactivity_timeout=300,
+            inactivity_timeout=RABBIT_INACTIVITY_SEC,
         ):
             if method is None and properties is None and body is None:
                 # This is the timeout condition
@@ -261,16 +932,89 @@ class RabbitChannel(QueueChannel):
                 raise pika.exceptions.AMQPError()
             yield (None, method, properties, body)
 
+    def _manual_ack_consumption(self, routing_key: str) -> Iterable[CallbackArgument]:
+        if self.acker is None or self.acker.channel is not self._channel:
+            # Delivery tags are per channel, so start fresh on a rebuilt channel.
+            self.acker = titanpublic.flow_control.AckBatcher(
+                self._channel, batch_size=self.prefetch.ack_batch_size()
+            )
+        self._channel.basic_qos(prefetch_count=self.prefetch.prefetch, global_qos=True)
+
+        # Wake up often enough to send held acks when messages stop coming.
+        idle_sec = 0
+        for method, properties, body in self._channel.consume(
+            queue=routing_key,
+            auto_ack=False,
+            inactivity_timeout=titanpublic.flow_control.ACK_MAX_DELAY_SEC,
+        ):
+            if method is None and properties is None and body is None:
+                self.acker.flush()
+                idle_sec += titanpublic.flow_control.ACK_MAX_DELAY_SEC
+                if idle_sec >= RABBIT_INACTIVITY_SEC:
+                    # This is the timeout condition
+                    logging.debug("Pika timeout")
+                    raise pika.exceptions.AMQPError()
+                continue
+            idle_sec = 0
+            self.acker.deliver()
+            yield (None, method, properties, body)
+
+    def ack_impl(self, routing_key: str, callback_args: CallbackArgument) -> None:
+        if not self.manual_ack:
+            return
+        self.acker.ack(callback_args[1].delivery_tag)
+
+    def observe_callback_impl(
+        self, routing_key: str, callback_sec: float, parallelism: int
+    ) -> None:
+        if not self.manual_ack:
+            return
+        self.prefetch.parallelism = parallelism
+        new_prefetch = self.prefetch.observe(callback_sec)
+        if new_prefetch is not None:
+            logging.info(f"Setting prefetch to {new_prefetch}")
+            self.acker.batch_size = self.prefetch.ack_batch_size()
+            self._channel.basic_qos(prefetch_count=new_prefetch, global_qos=True)
+
+    def nack_impl(self, routing_key: str, callback_args: CallbackArgument) -> None:
+        if not self.manual_ack:
+            return
+        self.acker.nack(callback_args[1].delivery_tag, requeue=True)
+
+    def consumption_stopped_impl(self, routing_key: str) -> None:
+        # Held acks would otherwise wait for the next idle timeout, which never comes
+        #  once we stop consuming.
+        if self.acker is not None and self.acker.channel is self._channel:
+            self.acker.flush()
+
 
 @functools.lru_cache(1)
 def get_rabbit_channel(
-    rabbitmq_user: str, rabbitmq_password: str, rabbitmq_broker_id: str
+    rabbitmq_user: str,
+    rabbitmq_password: str,
+    rabbitmq_broker_id: str,
+    publisher_confirms: bool = False,
+    manual_ack: bool = False,
 ) -> RabbitChannel:
     """Creates a singleton"""
-    return RabbitChannel(rabbitmq_user, rabbitmq_password, rabbitmq_broker_id)
+    return RabbitChannel(
+        rabbitmq_user,
+        rabbitmq_password,
+        rabbitmq_broker_id,
+        publisher_confirms=publisher_confirms,
+        manual_ack=manual_ack,
+    )
 
 
 @functools.lru_cache(1)
 def get_redis_channel(host: str = "localhost", port: int = 6379) -> RedisChannel:
     """Creates a singleton"""
     return RedisChannel(host=host, port=port)
+
+
+@functools.lru_cache(1)
+def get_reliable_redis_channel(
+    host: str = "localhost", port: int = 6379
+) -> ReliableRedisChannel:
+    """Creates a singleton"""
+    return ReliableRedisChannel(host=host, port=port)
@@ -1,12 +1,16 @@
+import collections
 import functools
 import os
+import threading
 import time
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 import warnings
 
 from frozendict import frozendict
 import yaml
 
+from . import cache_backends
+
 
 @functools.lru_cache(1)
 def get_secrets(dir: Optional[str] = None):
@@ -17,61 +21,128 @@ def get_secrets(dir: Optional[str] = None):
 
 
 class ExceptionCacheWrapper(object):
-    def __init__(self, exc: Exception, expiry: Optional[int]):
+    def __init__(self, exc: Exception, expiry: Optional[float]):
         self.exc_type = type(exc)
         self.exc_str = str(exc)
+        # Wall-clock time, from time.time(), so it works across processes
         self.expiry = expiry
 
 
+CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize"]
+)
+
+
 def cache(
     no_cache_exception: Optional[List[Exception]] = None,
     ttl_cache_exception: Optional[Dict[Exception, int]] = None,
+    maxsize: Optional[int] = None,
+    ttl: Optional[float] = None,
+    backend: Optional[cache_backends.CacheBackend] = None,
 ):
     """Just functools cache, but with exception handling.
 
     If no_cache_exception is set, don't cache when the function returns this value
     If ttl_cache_exception is set, this looks up ttl (in seconds) by exception class
         keys.  After expiration, the function will run again.
+    If maxsize is set, keep at most this many results (including exceptions),
+        evicting the least recently used.  Otherwise the cache is unbounded.
+    If ttl is set, successful results expire after this many seconds.
+    If backend is set, store results there instead of in a dict in this process.  See
+        cache_backends; with SqliteBackend or RedisBackend, processes share results.
+        Set maxsize on the backend instead.
+
+    The cache is thread-safe.  If several threads miss on the same arguments at
+    once, the function runs once and the others wait for its result.  Like
+    functools, the wrapped function has cache_info() and cache_clear().
     """
     warnings.warn("Please migrate to titan-common")
     if not no_cache_exception:
         no_cache_exception = list()
     if not ttl_cache_exception:
         ttl_cache_exception = dict()
+    if backend is None:
+        backend = cache_backends.DictBackend(maxsize)
+    elif maxsize is not None:
+        raise ValueError("Set maxsize on the backend")
+    maxsize = getattr(backend, "maxsize", None)
 
     def _cache(func):
-        __cache: Dict[Tuple[Any], Callable] = dict()
+        name = f"{func.__module__}.{func.__qualname__}"
+        # Held while computing a key, so that concurrent misses compute once.
+        __key_locks: Dict[Tuple[Any], threading.Lock] = dict()
+        lock = threading.Lock()
+        hits = misses = 0
+
+        def _lookup(key) -> Tuple[bool, Any]:
+            """Returns (found, result), and counts the hit."""
+            nonlocal hits
+            entry = backend.get(name, key)
+            if entry is None:
+                return False, None
+            result, expiry = entry
+            if expiry is not None and expiry <= time.time():
+                backend.delete(name, key)
+                return False, None
+            with lock:
+                hits += 1
+            return True, result
+
+        def _unwrap(result):
+            if isinstance(result, ExceptionCacheWrapper):
+                raise result.exc_type(result.exc_str)
+            return result
 
         @functools.wraps(func)
         def inner(*args, **kwargs):
-            nonlocal __cache
-            key = functools._make_key(args, kwargs, False)
-            if key in __cache:
-                result = __cache[key]
-                if isinstance(result, ExceptionCacheWrapper):
-                    if result.expiry and result.expiry <= time.monotonic():
-                        pass
-                    else:
-                        raise result.exc_type(result.exc_str)
-                else:
-                    return result
-
-            try:
-                value = func(*args, **kwargs)
-                __cache[key] = value
-                return value
-            except Exception as e:
-                if any([isinstance(e, E) for E in no_cache_exception]):
-                    # Don't cache anything
+            nonlocal misses
+            # Unlike functools._make_key, this is the same in every process.
+            key = (args, tuple(sorted(kwargs.items())))
+            found, result = _lookup(key)
+            if found:
+                return _unwrap(result)
+            with lock:
+                key_lock = __key_locks.setdefault(key, threading.Lock())
+
+            with key_lock:
+                # Another thread may have computed this while we waited.
+                found, result = _lookup(key)
+                if found:
+                    return _unwrap(result)
+                with lock:
+                    misses += 1
+                try:
+                    value = func(*args, **kwargs)
+                    expiry = None if ttl is None else time.time() + ttl
+                    backend.set(name, key, (value, expiry))
+                    return value
+                except Exception as e:
+                    if any([isinstance(e, E) for E in no_cache_exception]):
+                        # Don't cache anything
+                        raise e
+                    expiry = None
+                    for E, exc_ttl in ttl_cache_exception.items():
+                        if isinstance(e, E):
+                            expiry = time.time() + exc_ttl
+                            break
+                    backend.set(name, key, (ExceptionCacheWrapper(e, expiry), expiry))
                     raise e
-                expiry = None
-                for E, ttl in ttl_cache_exception.items():
-                    if isinstance(e, E):
-                        expiry = time.monotonic() + ttl
-                        break
-                __cache[key] = ExceptionCacheWrapper(e, expiry)
-                raise e
+                finally:
+                    with lock:
+                        __key_locks.pop(key, None)
+
+        def cache_info() -> CacheInfo:
+            with lock:
+                return CacheInfo(hits, misses, maxsize, backend.size(name))
+
+        def cache_clear() -> None:
+            nonlocal hits, misses
+            backend.clear(name)
+            with lock:
+                hits = misses = 0
 
+        inner.cache_info = cache_info
+        inner.cache_clear = cache_clear
         return inner
 
     return _cache
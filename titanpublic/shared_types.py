@@ -1,4 +1,7 @@
-from typing import List, Tuple
+import bisect
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
 
 Date = int
 TeamName = str
@@ -6,35 +9,115 @@ Year = int
 
 
 class MultiRange(object):
-    """Some day we'll replace all our single ranges with multi-ranges"""
-    def __init__(self, ranges: List[Tuple[Date, Date]]):
-        ranges = sorted(ranges)
-
-        merged_ranges = list()
-        working_st, working_en = None, None
-        for i, ri in enumerate(ranges):
-            # These don't overlap but may touch.
-            if i+1 < len(ranges):
-                assert ri[1] <= ranges[i+1][0]
-
-            if working_st is None:
-                working_st, working_en = ri
+    """An immutable set of dates, stored as sorted, disjoint [st, en) ranges.
+
+    Overlapping or touching ranges are merged, and empty ones dropped, so equal sets
+    always have equal ranges.  MultiRanges are hashable, so can be cache keys.
+    """
+
+    __slots__ = ("_ranges", "_starts")
+
+    def __init__(self, ranges: Iterable[Tuple[Date, Date]]):
+        merged_ranges: List[Tuple[Date, Date]] = list()
+        for st, en in sorted(ranges):
+            if st >= en:
                 continue
+            if merged_ranges and st <= merged_ranges[-1][1]:
+                # Overlaps or touches the last range, so merge these
+                last_st, last_en = merged_ranges[-1]
+                merged_ranges[-1] = (last_st, max(last_en, en))
+            else:
+                merged_ranges.append((st, en))
+
+        object.__setattr__(self, "_ranges", tuple(merged_ranges))
+        object.__setattr__(self, "_starts", [st for st, _ in merged_ranges])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MultiRange is immutable")
+
+    def __reduce__(self):
+        return (MultiRange, (list(self._ranges),))
+
+    @property
+    def ranges(self) -> Tuple[Tuple[Date, Date], ...]:
+        return self._ranges
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, MultiRange):
+            return NotImplemented
+        return self._ranges == other._ranges
+
+    def __hash__(self) -> int:
+        return hash(self._ranges)
+
+    def __repr__(self) -> str:
+        return f"MultiRange({list(self._ranges)})"
+
+    def __iter__(self) -> Iterator[Tuple[Date, Date]]:
+        return iter(self._ranges)
+
+    def __bool__(self) -> bool:
+        return bool(self._ranges)
+
+    def union(self, other: "MultiRange") -> "MultiRange":
+        return MultiRange(self._ranges + other._ranges)
 
-            if working_en < ri[0]:
-                # There's been a gap add a range and start fresh
-                merged_ranges.append((working_st, working_en))
-                working_st, working_en = ri
+    def intersection(self, other: "MultiRange") -> "MultiRange":
+        # Sweep both sorted lists, like a merge.
+        result = list()
+        i, j = 0, 0
+        while i < len(self._ranges) and j < len(other._ranges):
+            (a_st, a_en), (b_st, b_en) = self._ranges[i], other._ranges[j]
+            st, en = max(a_st, b_st), min(a_en, b_en)
+            if st < en:
+                result.append((st, en))
+            if a_en < b_en:
+                i += 1
             else:
-                # Merge these
-                working_en = ri[1]
-        
-        # May need to go one more
-        if working_st is not None:
-            assert(working_en is not None)
-            merged_ranges.append((working_st, working_en))
-
-        self.ranges = merged_ranges
+                j += 1
+        return MultiRange(result)
+
+    def difference(self, other: "MultiRange") -> "MultiRange":
+        """Dates in self but not in other."""
+        result = list()
+        j = 0
+        for st, en in self._ranges:
+            # Skip other's ranges that end before this one starts.
+            while j < len(other._ranges) and other._ranges[j][1] <= st:
+                j += 1
+            k = j
+            while k < len(other._ranges) and other._ranges[k][0] < en:
+                other_st, other_en = other._ranges[k]
+                if st < other_st:
+                    result.append((st, other_st))
+                st = max(st, other_en)
+                k += 1
+            if st < en:
+                result.append((st, en))
+        return MultiRange(result)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def contains(self, date: Date) -> bool:
+        i = bisect.bisect_right(self._starts, date) - 1
+        return i >= 0 and date < self._ranges[i][1]
+
+    __contains__ = contains
+
+    def covers(self, other: "MultiRange") -> bool:
+        """True if every date in other is in self."""
+        return not other.difference(self)
+
+    def mask(self, dates) -> np.ndarray:
+        """Whether each date in an array is in the set."""
+        dates = np.asarray(dates)
+        if not self._ranges:
+            return np.zeros(dates.shape, dtype=bool)
+        ends = np.array([en for _, en in self._ranges])
+        i = np.searchsorted(self._starts, dates, side="right") - 1
+        return (i >= 0) & (dates < ends[np.maximum(i, 0)])
 
 
 class TitanException(Exception):